@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# PYTHON INCLUSIONS ---------------------------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+import os, sqlite3, time
+try: from .wav_tools import scan_wav_headers, get_wav_duration
+except: from wav_tools import scan_wav_headers, get_wav_duration
+
+
+# CONSTANTS AND DEFINITIONS -------------------------------------------------------------------------------------------
+
+MANIFEST_FILE_NAME = '_a3em_manifest.db'
+MANIFEST_VERSION = 2
+AUDIO_TIMESTAMP_FORMAT = '%Y-%m-%d %H-%M-%S'
+DEFAULT_SCAN_WORKERS = 8
+PROGRESS_INTERVAL_S = 0.25
+
+
+# DIRECTORY WALKING FUNCTIONS -----------------------------------------------------------------------------------------
+
+def _list_clip_directory(card_root, directory):
+   subdirectories, clips = [], []
+   with os.scandir(os.path.join(card_root, directory)) as entries:
+      for entry in entries:
+         relative_path = os.path.join(directory, entry.name) if directory else entry.name
+         if entry.is_dir():
+            subdirectories.append((relative_path, entry.stat().st_mtime_ns))
+         elif entry.name.endswith('.wav') and not entry.name.startswith('.'):
+            info = entry.stat()
+            try: timestamp = datetime.strptime(entry.name[:-4], AUDIO_TIMESTAMP_FORMAT).isoformat(' ')
+            except ValueError: timestamp = None
+            clips.append((relative_path, directory, timestamp, info.st_size, info.st_mtime_ns))
+   return subdirectories, clips
+
+def walk_clip_tree(card_root, skip_directory=None, max_workers=DEFAULT_SCAN_WORKERS, list_directory=_list_clip_directory):
+   with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      pending = {executor.submit(list_directory, card_root, ''): ('', os.stat(card_root).st_mtime_ns)}
+      try:
+         while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+               directory, mtime_ns = pending.pop(future)
+               subdirectories, clips = future.result()
+               yield directory, mtime_ns, subdirectories, clips
+
+               # Overlap the listings of all child directories, except those the caller already knows about
+               for subdirectory, subdirectory_mtime_ns in subdirectories:
+                  if skip_directory is not None and skip_directory(subdirectory, subdirectory_mtime_ns):
+                     yield subdirectory, subdirectory_mtime_ns, None, None
+                  else:
+                     pending[executor.submit(list_directory, card_root, subdirectory)] = (subdirectory, subdirectory_mtime_ns)
+      finally:
+         for future in pending:
+            future.cancel()
+
+
+# MANIFEST CLASS ------------------------------------------------------------------------------------------------------
+
+class ClipManifest:
+
+   def __init__(self, card_root):
+      self.card_root = card_root
+      try:
+         self.connection = sqlite3.connect(os.path.join(card_root, MANIFEST_FILE_NAME), check_same_thread=False)
+         self._create_schema()
+      except (OSError, sqlite3.Error):
+         self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+         self._create_schema()
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+
+   def _create_schema(self):
+      if self.connection.execute('PRAGMA user_version').fetchone()[0] != MANIFEST_VERSION:
+         self.connection.executescript('''
+            DROP TABLE IF EXISTS clips;
+            DROP TABLE IF EXISTS directories;
+            CREATE TABLE clips (path TEXT PRIMARY KEY, directory TEXT NOT NULL, timestamp TEXT, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                                header_read INTEGER NOT NULL DEFAULT 0, duration REAL, sample_rate INTEGER);
+            CREATE INDEX clips_by_directory ON clips (directory);
+            CREATE INDEX clips_by_timestamp ON clips (timestamp);
+            CREATE TABLE directories (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, is_leaf INTEGER NOT NULL);
+            PRAGMA user_version = {};'''.format(MANIFEST_VERSION))
+
+   def update(self, full_rescan=False, max_workers=DEFAULT_SCAN_WORKERS, progress=None, cancel=None):
+      known_directories = {path: (mtime_ns, is_leaf) for path, mtime_ns, is_leaf in self.connection.execute('SELECT path, mtime_ns, is_leaf FROM directories')}
+      seen_directories = set()
+      last_progress = time.monotonic()
+
+      # Leaf directories whose modification time has not changed still hold the same clips
+      def is_unchanged(directory, mtime_ns):
+         return not full_rescan and known_directories.get(directory) == (mtime_ns, 1)
+
+      with self.connection:
+         for directory, mtime_ns, subdirectories, clips in walk_clip_tree(self.card_root, is_unchanged, max_workers):
+            if cancel is not None and cancel.is_set():
+               return False
+            seen_directories.add(directory)
+            if clips is not None:
+
+               # Keep the header details of any clip whose size and modification time are unchanged
+               headers = {(path, size, mtime_ns): header for path, size, mtime_ns, *header in self.connection.execute(
+                          'SELECT path, size, mtime_ns, header_read, duration, sample_rate FROM clips WHERE directory = ?', (directory,))}
+               self.connection.execute('DELETE FROM clips WHERE directory = ?', (directory,))
+               self.connection.executemany('INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                           (clip + tuple(headers.get((clip[0], clip[3], clip[4]), (0, None, None))) for clip in clips))
+               self.connection.execute('INSERT OR REPLACE INTO directories VALUES (?, ?, ?)', (directory, mtime_ns, int(not subdirectories)))
+            if progress is not None and time.monotonic() - last_progress >= PROGRESS_INTERVAL_S:
+               progress(self.summary())
+               last_progress = time.monotonic()
+
+         # Forget any directories that no longer exist on the card
+         for directory in known_directories.keys() - seen_directories:
+            self.connection.execute('DELETE FROM clips WHERE directory = ?', (directory,))
+            self.connection.execute('DELETE FROM directories WHERE path = ?', (directory,))
+      return True
+
+   def update_headers(self, max_workers=DEFAULT_SCAN_WORKERS, progress=None, cancel=None):
+      paths = [path for path, in self.connection.execute('SELECT path FROM clips WHERE header_read = 0')]
+      last_progress = time.monotonic()
+
+      # Only clips that are new or changed since their header was last read need to be opened
+      with self.connection:
+         wav_paths = (os.path.join(self.card_root, path) for path in paths)
+         for num_read, (path, (_, header)) in enumerate(zip(paths, scan_wav_headers(wav_paths, max_workers)), start=1):
+            if cancel is not None and cancel.is_set():
+               return False
+            self.connection.execute('UPDATE clips SET header_read = 1, duration = ?, sample_rate = ? WHERE path = ?',
+                                    (get_wav_duration(header), header.sample_rate, path) if header else (None, None, path))
+            if progress is not None and time.monotonic() - last_progress >= PROGRESS_INTERVAL_S:
+               progress(num_read, len(paths))
+               last_progress = time.monotonic()
+      return True
+
+   def forget_headers(self, wav_paths):
+      with self.connection:
+         self.connection.executemany('UPDATE clips SET header_read = 0, duration = NULL, sample_rate = NULL WHERE path = ?',
+                                     ((os.path.relpath(wav_path, self.card_root),) for wav_path in wav_paths))
+
+   def summary(self):
+      num_clips, total_bytes, first_timestamp, last_timestamp = \
+         self.connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(timestamp), MAX(timestamp) FROM clips').fetchone()
+      return num_clips, total_bytes, \
+             datetime.fromisoformat(first_timestamp) if first_timestamp else None, \
+             datetime.fromisoformat(last_timestamp) if last_timestamp else None
+
+   def clips(self, start=None, end=None):
+      query, parameters = 'SELECT path, timestamp, size, mtime_ns FROM clips', []
+      if start is not None or end is not None:
+         query += ' WHERE timestamp >= ? AND timestamp <= ?'
+         parameters = [start.isoformat(' ') if start else '', end.isoformat(' ') if end else '9999']
+      for path, timestamp, size, mtime_ns in self.connection.execute(query + ' ORDER BY timestamp, path', parameters):
+         yield os.path.join(self.card_root, path), datetime.fromisoformat(timestamp) if timestamp else None, size, mtime_ns
+
+   def recordings(self):
+      for path, timestamp, duration, sample_rate in self.connection.execute(
+            'SELECT path, timestamp, duration, sample_rate FROM clips WHERE header_read = 1 ORDER BY timestamp, path'):
+         yield os.path.join(self.card_root, path), datetime.fromisoformat(timestamp) if timestamp else None, duration, sample_rate
+
+   def close(self):
+      self.connection.close()
@@ -3,19 +3,26 @@
 
 # PYTHON INCLUSIONS ---------------------------------------------------------------------------------------------------
 
-try: from .read_config import read_config
-except: from read_config import read_config
+try: from .read_config import read_config, read_audio_phases, read_device_timezone
+except: from read_config import read_config, read_audio_phases, read_device_timezone
 try: from .write_config import write_config
 except: from write_config import write_config
 try: from .tkcal import DateEntry
 except: from tkcal import DateEntry
-try: from .relabel_logs import relabel_audio_files
-except: from relabel_logs import relabel_audio_files
+try: from .relabel_logs import relabel_audio_files, undo_audio_relabel
+except: from relabel_logs import relabel_audio_files, undo_audio_relabel
+try: from .clip_manifest import ClipManifest
+except: from clip_manifest import ClipManifest
+try: from .offload import offload_card, offload_cards, usb_hub_for_device, verify_offload, VERIFICATION_REPORT_NAME
+except: from offload import offload_card, offload_cards, usb_hub_for_device, verify_offload, VERIFICATION_REPORT_NAME
+try: from .processing import estimate_clock_offset, read_device_label, CONFIG_FILE_NAME
+except: from processing import estimate_clock_offset, read_device_label, CONFIG_FILE_NAME
+try: from .wav_tools import summarize_recordings, scan_wav_files, repair_wav_files, WAV_EMPTY_FILE, WAV_UNREADABLE_HEADER, WAV_SIZE_MISMATCH
+except: from wav_tools import summarize_recordings, scan_wav_files, repair_wav_files, WAV_EMPTY_FILE, WAV_UNREADABLE_HEADER, WAV_SIZE_MISMATCH
 from tkinter import ttk, filedialog
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import partial
-from pathlib import Path
-import glob, os, psutil, re, sys, threading
+import os, psutil, queue, re, sys, threading
 import pytz, tzlocal
 import tkinter as tk
 import asyncio
@@ -23,7 +30,6 @@ import asyncio
 
 # CONSTANTS AND DEFINITIONS -------------------------------------------------------------------------------------------
 
-CONFIG_FILE_NAME = '_a3em.cfg'
 MAX_DEVICE_LABEL_LEN = 15
 MAX_AUDIO_TRIGGER_TIMES = 12
 
@@ -32,6 +38,7 @@ DEFAULT_MIN_FREQUENCY_OF_INTEREST = 250
 DEFAULT_AUDIO_SAMPLE_RATE_HZ = 16000
 DEFAULT_AUDIO_CLIP_LENGTH_S = 10
 DEFAULT_IMU_SAMPLE_RATE_HZ = 25
+SCAN_POLL_INTERVAL_MS = 200
 
 VALID_AUDIO_MODES = {'Threshold-Based': 'AMPLITUDE',
                      'Schedule-Based': 'SCHEDULED',
@@ -59,6 +66,12 @@ def get_download_directory():
    else:
       return os.path.join(os.path.expanduser('~'), 'Downloads')
 
+def get_offload_directory():
+   return os.path.join(get_download_directory(), 'A3EM Offload ' + datetime.today().strftime('%Y-%m-%d'))
+
+def get_card_name(card_root, device=None):
+   return read_device_label(card_root) or os.path.basename(os.path.normpath(card_root)) or os.path.basename(device or '') or 'A3EM'
+
 format_complete = False
 def format_callback(command, modifier, arg):
    global format_complete
@@ -104,18 +117,44 @@ def format_sd_card_as_exfat(mountpoint, device, passwd):
       os.system(f'echo {passwd} | sudo -S mkfs -t exfat -c 4096 -L A3EM {device}')
       os.system(f'echo {passwd} | sudo -S fsck.exfat {device}')
 
-def relabel_thread(self, audio_dir, original_datetime, offset_in_seconds):
-      relabel_audio_files(audio_dir, offset_in_seconds, original_timestamp=original_datetime)
+def relabel_thread(self, audio_dir, original_datetime, offset_in_seconds, anchors=None):
+      try:
+         time_zone = read_device_timezone(os.path.join(audio_dir, CONFIG_FILE_NAME))
+         plan = relabel_audio_files(audio_dir, offset_in_seconds, original_timestamp=original_datetime, anchors=anchors, time_zone=time_zone)
+         message = 'Resumed and completed an interrupted relabel operation\n\nNo new offset was applied' if plan.resumed else 'Operation complete!'
+      except (FileExistsError, ValueError) as error:
+         message = 'Relabeling aborted without changing any files\n\n' + str(error)
+      except OSError as error:
+         message = 'Relabeling was interrupted\n\n{}\n\nReconnect the card and run Relabel again to finish the interrupted operation'.format(error)
       self._clear_canvas()
-      tk.Label(self.canvas, text='Operation complete!').pack(fill=tk.BOTH, expand=True)
+      tk.Label(self.canvas, text=message).pack(fill=tk.BOTH, expand=True)
 
-def relabel_log_files(self, original_date, original_time, target_date, target_time):
+def undo_relabel_thread(self, audio_dir):
+      try:
+         plan = undo_audio_relabel(audio_dir)
+         message = 'Restored {:,} audio files to their original names'.format(len(plan.renames))
+      except (FileExistsError, FileNotFoundError) as error:
+         message = 'Unable to undo relabeling\n\n' + str(error)
+      except OSError as error:
+         message = 'Undoing the relabel was interrupted\n\n{}\n\nReconnect the card and run Relabel or Undo Last Relabel again to finish the interrupted operation'.format(error)
+      self._clear_canvas()
+      tk.Label(self.canvas, text=message).pack(fill=tk.BOTH, expand=True)
+
+def undo_relabel_log_files(self):
+   if tk.messagebox.askyesno('A3EM Relabel', 'Restore all audio files on {} to the names they had before the last relabel?'.format(self.target_selection.get())):
+      self._clear_canvas()
+      tk.Label(self.canvas, text='Restoring original audio file names, please wait...').pack(fill=tk.BOTH, expand=True)
+      threading.Thread(target=undo_relabel_thread, args=(self, self.target_selection.get())).start()
+
+def relabel_log_files(self, anchor_rows):
    try:
+      anchors = sorted((datetime.strptime(original_date.get() + ' ' + original_time.get(), '%Y-%m-%d %H:%M:%S'),
+                        datetime.strptime(target_date.get() + ' ' + target_time.get(), '%Y-%m-%d %H:%M:%S'))
+                       for original_date, original_time, target_date, target_time in anchor_rows)
       self._clear_canvas()
       tk.Label(self.canvas, text='Relabeling audio files, please wait...').pack(fill=tk.BOTH, expand=True)
-      original_datetime = datetime.strptime(original_date.get() + ' ' + original_time.get(), '%Y-%m-%d %H:%M:%S').timestamp()
-      target_datetime = datetime.strptime(target_date.get() + ' ' + target_time.get(), '%Y-%m-%d %H:%M:%S').timestamp()
-      relabeling_thread = threading.Thread(target=relabel_thread, args=(self, self.target_selection.get(), int(original_datetime), int(target_datetime - original_datetime)))
+      original_datetime, target_datetime = anchors[0][0].timestamp(), anchors[0][1].timestamp()
+      relabeling_thread = threading.Thread(target=relabel_thread, args=(self, self.target_selection.get(), int(original_datetime), int(target_datetime - original_datetime), anchors if len(anchors) > 1 else None))
       relabeling_thread.start()
    except ValueError:
       tk.messagebox.showerror('A3EM Formatting Error', 'Invalid datetime format\n\nEnsure that the date is formatted as YYYY-MM-DD and the time as HH:MM:SS')
@@ -297,7 +336,8 @@ class A3EMGui(ttk.Frame):
       self.target_selector['values'] = ['Local Directory']
       self.configure_button = ttk.Button(control_bar, text='Configure', command=self._configure, state=['disabled'])
       self.configure_button.grid(column=2, row=0)
-      ttk.Button(control_bar, text='Quit', command=self._exit).grid(column=3, row=0)
+      ttk.Button(control_bar, text='Offload All Cards', command=self._batch_offload_start).grid(column=3, row=0)
+      ttk.Button(control_bar, text='Quit', command=self._exit).grid(column=4, row=0)
 
       # Create the operations bar
       self.operations_bar = ttk.Frame(self)
@@ -740,24 +780,13 @@ class A3EMGui(ttk.Frame):
       self.imu_motion_fields = [field1, field2]
       self._imu_mode_changed(phase)
 
-   def _post_deployment_tools(self):
-      files_list = sorted(glob.glob(os.path.join(self.target_selection.get(), '**', '*.wav'), recursive=True))
-      first_datetime, last_datetime = None, None
-      while not first_datetime:
-         for file in files_list:
-            try: first_datetime = datetime.strptime(Path(file).stem, '%Y-%m-%d %H-%M-%S'); break
-            except ValueError: continue
-      while not last_datetime:
-         for file in reversed(files_list):
-            try: last_datetime = datetime.strptime(Path(file).stem, '%Y-%m-%d %H-%M-%S'); break
-            except ValueError: continue
+   def _post_deployment_tools(self, num_files, data_size, first_datetime, last_datetime, recordings=None):
       if first_datetime and last_datetime:
          duration = last_datetime - first_datetime
          duration = str(duration.days) + ' days, ' + str(duration.seconds // 3600) + ' hours, ' + str((duration.seconds // 60) % 60) + ' minutes, ' + str(duration.seconds % 60) + ' seconds'
       else:
          duration = 'Unknown'
-      num_files = len(files_list)
-      data_size = sum([os.path.getsize(file) for file in files_list]) / 1024 / 1024 / 1024
+      data_size = data_size / 1024 / 1024 / 1024
       self._clear_canvas()
       prompt_area = ttk.Frame(self.canvas)
       prompt_area.place(relx=0.5, anchor=tk.N)
@@ -766,6 +795,16 @@ class A3EMGui(ttk.Frame):
       ttk.Label(prompt_area, text=f'      Deployment Duration:  {duration}').grid(column=0, row=2, sticky=tk.W+tk.N+tk.S)
       ttk.Label(prompt_area, text=f'      Number of Audio Clips:  {num_files:,}').grid(column=0, row=3, sticky=tk.W+tk.N+tk.S)
       ttk.Label(prompt_area, text=f'      Audio Data Total Size:  {data_size:.5} GB').grid(column=0, row=4, sticky=tk.W+tk.N+tk.S)
+      if recordings is not None:
+         ttk.Label(prompt_area, text=f'      Recorded Audio Duration:  {recordings.recorded_seconds / 3600:,.2f} hours').grid(column=0, row=5, sticky=tk.W+tk.N+tk.S)
+         phase_details = ['      Phase "{}":  {:,} clips, {:,.2f} hours at {}'.format(name, recordings.phase_clips[name], recordings.phase_seconds[name] / 3600,
+                                                                                      ', '.join(f'{rate:,} Hz' for rate in sorted(recordings.phase_sample_rates[name])))
+                          for name in recordings.phase_clips]
+         if phase_details:
+            ttk.Label(prompt_area, text='\n'.join(phase_details), justify=tk.LEFT).grid(column=0, row=6, sticky=tk.W+tk.N+tk.S)
+         if recordings.mismatched_clips or recordings.unreadable_clips:
+            ttk.Label(prompt_area, text=f'      Sample-Rate Mismatches:  {len(recordings.mismatched_clips):,} clips,  Unreadable Headers:  {len(recordings.unreadable_clips):,} clips',
+                      foreground='red').grid(column=0, row=7, sticky=tk.W+tk.N+tk.S)
       ttk.Separator(prompt_area, orient='horizontal').grid(column=0, row=9, pady=20, columnspan=5, sticky=tk.W+tk.E+tk.N+tk.S)
       tool_label = ttk.Label(prompt_area, text='Select Tool', font=('Helvetica', '12', 'bold'))
       tool_label.grid(column=0, row=10, columnspan=5, pady=(0,10), sticky=tk.W+tk.E+tk.N+tk.S)
@@ -773,24 +812,74 @@ class A3EMGui(ttk.Frame):
          ttk.Label(tool_area, text=' ', width=2).grid(column=2, row=12, sticky=tk.W+tk.E)
          ttk.Label(tool_area, text='Original Date and Time').grid(column=0, row=12, columnspan=2, sticky=tk.W)
          ttk.Label(tool_area, text='Target Date and Time').grid(column=3, row=12, columnspan=2, sticky=tk.W)
-         orig_date_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[0] if first_datetime else datetime.today().strftime('%Y-%m-%d'))
-         orig_time_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[1] if first_datetime else '00:00:00')
-         target_date_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[0] if first_datetime else datetime.today().strftime('%Y-%m-%d'))
-         target_time_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[1] if first_datetime else '00:00:00')
-         orig_date = DateEntry(tool_area, textvariable=orig_date_var, selectmode='day', firstweekday='sunday', showweeknumbers=False, date_pattern='yyyy-mm-dd')
-         orig_date.grid(column=0, row=13, sticky=tk.W)
-         orig_date.bind('<FocusIn>', self._focus_in)
-         orig_date.bind('<Button-1>', self._date_entry_clicked)
-         orig_date.bind('<<DateEntrySelected>>', self._date_entry_changed)
-         ttk.Entry(tool_area, textvariable=orig_time_var, width=7).grid(column=1, row=13, sticky=tk.W)
-         target_date = DateEntry(tool_area, textvariable=target_date_var, selectmode='day', firstweekday='sunday', showweeknumbers=False, date_pattern='yyyy-mm-dd')
-         target_date.grid(column=3, row=13, sticky=tk.W)
-         target_date.bind('<FocusIn>', self._focus_in)
-         target_date.bind('<Button-1>', self._date_entry_clicked)
-         target_date.bind('<<DateEntrySelected>>', partial(self._deployment_end_changed, None, 0)) 
-         ttk.Entry(tool_area, textvariable=target_time_var, width=7).grid(column=4, row=13, sticky=tk.W)
-         button = ttk.Button(tool_area, text='Relabel', command=partial(relabel_log_files, self, orig_date_var, orig_time_var, target_date_var, target_time_var))
+         anchor_rows = []
+         def add_anchor_row():
+            row = 13 + len(anchor_rows)
+            orig_date_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[0] if first_datetime else datetime.today().strftime('%Y-%m-%d'))
+            orig_time_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[1] if first_datetime else '00:00:00')
+            target_date_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[0] if first_datetime else datetime.today().strftime('%Y-%m-%d'))
+            target_time_var = tk.StringVar(tool_area, str(first_datetime).split(' ')[1] if first_datetime else '00:00:00')
+            orig_date = DateEntry(tool_area, textvariable=orig_date_var, selectmode='day', firstweekday='sunday', showweeknumbers=False, date_pattern='yyyy-mm-dd')
+            orig_date.grid(column=0, row=row, sticky=tk.W)
+            orig_date.bind('<FocusIn>', self._focus_in)
+            orig_date.bind('<Button-1>', self._date_entry_clicked)
+            orig_date.bind('<<DateEntrySelected>>', self._date_entry_changed)
+            ttk.Entry(tool_area, textvariable=orig_time_var, width=7).grid(column=1, row=row, sticky=tk.W)
+            target_date = DateEntry(tool_area, textvariable=target_date_var, selectmode='day', firstweekday='sunday', showweeknumbers=False, date_pattern='yyyy-mm-dd')
+            target_date.grid(column=3, row=row, sticky=tk.W)
+            target_date.bind('<FocusIn>', self._focus_in)
+            target_date.bind('<Button-1>', self._date_entry_clicked)
+            target_date.bind('<<DateEntrySelected>>', partial(self._deployment_end_changed, None, 0)) 
+            ttk.Entry(tool_area, textvariable=target_time_var, width=7).grid(column=4, row=row, sticky=tk.W)
+            anchor_rows.append((orig_date_var, orig_time_var, target_date_var, target_time_var))
+         add_anchor_row()
+         estimate_label = ttk.Label(tool_area, text='')
+         estimate_label.grid(column=0, row=39, columnspan=5, pady=(5,0), sticky=tk.W)
+         def estimate_offset():
+            estimate_label.configure(text='Estimating clock offset from GPS times in the device logs...')
+            updates = queue.Queue()
+            threading.Thread(target=self._estimate_clock_offset, args=(updates,), daemon=True).start()
+            self.after(SCAN_POLL_INTERVAL_MS, self._poll_clock_estimate, updates, estimate_label, anchor_rows, add_anchor_row, first_datetime, last_datetime)
+         anchor_button = ttk.Button(tool_area, text='Add Drift Anchor', command=add_anchor_row)
+         anchor_button.grid(column=0, row=40, columnspan=2, pady=5, sticky=tk.W+tk.E+tk.N+tk.S)
+         button = ttk.Button(tool_area, text='Relabel', command=partial(relabel_log_files, self, anchor_rows))
+         button.grid(column=3, row=40, columnspan=2, pady=5, sticky=tk.W+tk.E+tk.N+tk.S)
+         undo_button = ttk.Button(tool_area, text='Undo Last Relabel', command=partial(undo_relabel_log_files, self))
+         undo_button.grid(column=0, row=41, columnspan=2, pady=(0,5), sticky=tk.W+tk.E+tk.N+tk.S)
+         estimate_button = ttk.Button(tool_area, text='Estimate Offset', command=estimate_offset)
+         estimate_button.grid(column=3, row=41, columnspan=2, pady=(0,5), sticky=tk.W+tk.E+tk.N+tk.S)
+      def repair_audio(self, tool_area):
+         status_label = ttk.Label(tool_area, text='Checking audio file headers, please wait...', justify=tk.LEFT)
+         status_label.grid(column=0, row=12, columnspan=5, sticky=tk.W)
+         button = ttk.Button(tool_area, text='Repair', state=['disabled'])
          button.grid(column=3, row=14, columnspan=2, pady=5, sticky=tk.W+tk.E+tk.N+tk.S)
+         updates = queue.Queue()
+         threading.Thread(target=self._check_audio_files, args=(updates,), daemon=True).start()
+         self.after(SCAN_POLL_INTERVAL_MS, self._poll_audio_repair, updates, status_label, button)
+      def target_dir_entry(self, tool_area):
+         target_dir = tk.StringVar(tool_area, os.path.join(get_offload_directory(), get_card_name(self.target_selection.get())))
+         def choose_target_dir():
+            new_directory = filedialog.askdirectory(parent=self, title='Choose Offload Directory', initialdir=os.path.dirname(target_dir.get()))
+            if new_directory:
+               target_dir.set(new_directory)
+         ttk.Label(tool_area, text='Target Directory').grid(column=0, row=12, columnspan=5, sticky=tk.W)
+         ttk.Entry(tool_area, textvariable=target_dir, width=40).grid(column=0, row=13, columnspan=4, sticky=tk.W+tk.E)
+         ttk.Button(tool_area, text='Browse', command=choose_target_dir).grid(column=4, row=13, sticky=tk.W+tk.E)
+         return target_dir
+      def offload_tool(self, tool_area):
+         target_dir = target_dir_entry(self, tool_area)
+         status_label = ttk.Label(tool_area, text='Files already copied and verified in the target directory will be skipped', justify=tk.LEFT)
+         status_label.grid(column=0, row=14, columnspan=5, pady=5, sticky=tk.W)
+         button = ttk.Button(tool_area, text='Start Offload')
+         button.configure(command=partial(self._start_offload, target_dir, status_label, button))
+         button.grid(column=3, row=15, columnspan=2, pady=5, sticky=tk.W+tk.E+tk.N+tk.S)
+      def verify_tool(self, tool_area):
+         target_dir = target_dir_entry(self, tool_area)
+         status_label = ttk.Label(tool_area, text='Every file on the card will be hashed and compared against its offloaded copy', justify=tk.LEFT)
+         status_label.grid(column=0, row=14, columnspan=5, pady=5, sticky=tk.W)
+         button = ttk.Button(tool_area, text='Start Verification')
+         button.configure(command=partial(self._start_verification, target_dir, status_label, button))
+         button.grid(column=3, row=15, columnspan=2, pady=5, sticky=tk.W+tk.E+tk.N+tk.S)
       def tool_click(self, tool_area, tool_name):
          tool_area.destroy()
          tool_area = ttk.Frame(prompt_area)
@@ -798,6 +887,12 @@ class A3EMGui(ttk.Frame):
          tool_label.configure(text=tool_name)
          if tool_name == 'Relabel Log Files':
             relabel_logs(self, tool_area)
+         elif tool_name == 'Repair Audio Files':
+            repair_audio(self, tool_area)
+         elif tool_name == 'Offload Card':
+            offload_tool(self, tool_area)
+         elif tool_name == 'Verify Offload':
+            verify_tool(self, tool_area)
          else:
             tk.messagebox.showinfo('A3EM Info', 'This tool is not yet implemented')
       rows = []
@@ -808,18 +903,327 @@ class A3EMGui(ttk.Frame):
          rows[i].grid(column=0, row=i, columnspan=4, sticky=tk.W+tk.E+tk.N+tk.S)
       button1 = ttk.Button(rows[0], text='Relabel Log Files', width=20, command=partial(tool_click, self, tool_area, 'Relabel Log Files'))
       button1.pack(side=tk.LEFT, padx=(20,5), fill=tk.X, expand=True)
-      button2 = ttk.Button(rows[0], text='Todo', width=20, command=partial(tool_click, self, tool_area, 'Todo'), state=['disabled'])
+      button2 = ttk.Button(rows[0], text='Repair Audio Files', width=20, command=partial(tool_click, self, tool_area, 'Repair Audio Files'))
       button2.pack(side=tk.RIGHT, padx=(5,20), fill=tk.X, expand=True)
-      button3 = ttk.Button(rows[1], text='Todo', width=20, command=partial(tool_click, self, tool_area, 'Todo'), state=['disabled'])
+      button3 = ttk.Button(rows[1], text='Offload Card', width=20, command=partial(tool_click, self, tool_area, 'Offload Card'))
       button3.pack(side=tk.LEFT, padx=(20,5), fill=tk.X, expand=True)
-      button4 = ttk.Button(rows[1], text='Todo', width=20, command=partial(tool_click, self, tool_area, 'Todo'), state=['disabled'])
+      button4 = ttk.Button(rows[1], text='Verify Offload', width=20, command=partial(tool_click, self, tool_area, 'Verify Offload'))
       button4.pack(side=tk.RIGHT, padx=(5,20), fill=tk.X, expand=True)
 
+   def _scan_deployment(self, updates, cancel):
+      try:
+         with ClipManifest(self.target_selection.get()) as manifest:
+            if not manifest.update(progress=lambda summary: updates.put(('progress', summary)), cancel=cancel):
+               return
+            summary = manifest.summary()
+
+            # Read only the audio headers of new or changed clips to determine recorded durations and sample rates
+            if not manifest.update_headers(progress=lambda done, total: updates.put(('headers', (done, total))), cancel=cancel):
+               return
+            try: phases = read_audio_phases(os.path.join(self.target_selection.get(), CONFIG_FILE_NAME))
+            except (OSError, ValueError): phases = []
+            recordings = summarize_recordings(manifest.recordings(), phases)
+         updates.put(('done', (*summary, recordings)))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _poll_deployment_scan(self, updates, cancel, progress_label):
+      if not progress_label.winfo_exists():
+         cancel.set()
+         return
+      try:
+         while True:
+            status, result = updates.get_nowait()
+            if status == 'progress':
+               num_files, data_size, first_datetime, last_datetime = result
+               progress_label.configure(text=f'Scanned {num_files:,} audio clips ({data_size / 1024 / 1024 / 1024:.3f} GB)' +
+                                             (f'\nfrom {first_datetime} to {last_datetime}' if first_datetime else ''))
+            elif status == 'headers':
+               progress_label.configure(text='Reading audio headers: {:,} of {:,} clips'.format(*result))
+            elif status == 'done':
+               self._post_deployment_tools(*result)
+               return
+            else:
+               self._clear_canvas()
+               tk.Label(self.canvas, text='Unable to load deployment details').pack(fill=tk.BOTH, expand=True)
+               tk.messagebox.showerror('A3EM Error', 'ERROR\n\nUnable to scan {}\n\n{}'.format(self.target_selection.get(), result))
+               return
+      except queue.Empty:
+         pass
+      if cancel.is_set():
+         self._clear_canvas()
+         tk.Label(self.canvas, text='Deployment scan cancelled').pack(fill=tk.BOTH, expand=True)
+      else:
+         self.after(SCAN_POLL_INTERVAL_MS, self._poll_deployment_scan, updates, cancel, progress_label)
+
+   def _run_offload(self, updates, target_dir, cancel):
+      try:
+         result = offload_card(self.target_selection.get(), target_dir, progress=lambda result: updates.put(('progress', result)), cancel=cancel)
+         updates.put(('done', result))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _start_offload(self, target_dir, status_label, button):
+      updates, cancel = queue.Queue(), threading.Event()
+      status_label.configure(text='Listing files on the card...')
+      button.configure(text='Cancel', command=cancel.set)
+      threading.Thread(target=self._run_offload, args=(updates, target_dir.get(), cancel), daemon=True).start()
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_offload, updates, cancel, target_dir, status_label, button)
+
+   def _poll_offload(self, updates, cancel, target_dir, status_label, button):
+      if not status_label.winfo_exists():
+         cancel.set()
+         return
+      try:
+         while True:
+            status, result = updates.get_nowait()
+            if status == 'error':
+               button.configure(text='Start Offload', command=partial(self._start_offload, target_dir, status_label, button))
+               status_label.configure(text='Offload failed')
+               tk.messagebox.showerror('A3EM Error', 'ERROR\n\nUnable to offload {} to {}\n\n{}'.format(self.target_selection.get(), target_dir.get(), result))
+               return
+            text = 'Copied {:,} of {:,} files ({:,.2f} GB of {:,.2f} GB on card), skipped {:,} already offloaded'.format(
+                   result.files_copied, result.files_total - result.files_skipped - result.files_renamed, result.bytes_copied / 1024 / 1024 / 1024,
+                   result.bytes_total / 1024 / 1024 / 1024, result.files_skipped)
+            if result.files_renamed:
+               text += ' and {:,} renamed since the last offload'.format(result.files_renamed)
+            if status == 'done':
+               text += '\n{} in {:,.0f} seconds ({:,.1f} MB/s)'.format('Cancelled' if result.cancelled else 'Finished', result.elapsed_s,
+                                                                      result.bytes_copied / 1024 / 1024 / max(result.elapsed_s, 1e-6))
+               if result.failed_files:
+                  text += '\nUnable to copy {:,} files, starting with {}'.format(len(result.failed_files), result.failed_files[0][0])
+               status_label.configure(text=text)
+               button.configure(text='Resume Offload' if result.cancelled or result.failed_files else 'Start Offload',
+                                command=partial(self._start_offload, target_dir, status_label, button))
+               return
+            status_label.configure(text=text)
+      except queue.Empty:
+         pass
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_offload, updates, cancel, target_dir, status_label, button)
+
+   def _run_verification(self, updates, target_dir, cancel):
+      try:
+         result = verify_offload(self.target_selection.get(), target_dir, progress=lambda result: updates.put(('progress', result)), cancel=cancel)
+         updates.put(('done', result))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _start_verification(self, target_dir, status_label, button):
+      updates, cancel = queue.Queue(), threading.Event()
+      status_label.configure(text='Listing files on the card...')
+      button.configure(text='Cancel', command=cancel.set)
+      threading.Thread(target=self._run_verification, args=(updates, target_dir.get(), cancel), daemon=True).start()
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_verification, updates, cancel, target_dir, status_label, button)
+
+   def _poll_verification(self, updates, cancel, target_dir, status_label, button):
+      if not status_label.winfo_exists():
+         cancel.set()
+         return
+      try:
+         while True:
+            status, result = updates.get_nowait()
+            if status == 'error':
+               button.configure(text='Start Verification', command=partial(self._start_verification, target_dir, status_label, button))
+               status_label.configure(text='Verification failed')
+               tk.messagebox.showerror('A3EM Error', 'ERROR\n\nUnable to verify {} against {}\n\n{}'.format(self.target_selection.get(), target_dir.get(), result))
+               return
+            checked_files = result.files_verified + len(result.mismatched_files) + len(result.missing_files) + len(result.unreadable_files)
+            text = 'Checked {:,} of {:,} files, {:,} match the card ({:,.2f} of {:,.2f} GB)'.format(
+                   checked_files, result.files_total, result.files_verified, result.bytes_verified / 1024 / 1024 / 1024, result.bytes_total / 1024 / 1024 / 1024)
+            if result.mismatched_files or result.missing_files or result.unreadable_files:
+               text += '\nMismatched:  {:,},  Missing:  {:,},  Unreadable:  {:,}'.format(len(result.mismatched_files), len(result.missing_files), len(result.unreadable_files))
+            if status == 'done':
+               text += '\n{} in {:,.0f} seconds, report saved to {}'.format('Cancelled' if result.cancelled else 'Finished', result.elapsed_s,
+                                                                             os.path.join(target_dir.get(), VERIFICATION_REPORT_NAME))
+               status_label.configure(text=text, foreground='red' if checked_files != result.files_verified else '')
+               button.configure(text='Start Verification', command=partial(self._start_verification, target_dir, status_label, button))
+               return
+            status_label.configure(text=text)
+      except queue.Empty:
+         pass
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_verification, updates, cancel, target_dir, status_label, button)
+
+   def _batch_offload_start(self):
+      self._clear_canvas()
+      cards, card_names = [], set()
+      for mountpoint, (device, _) in self.target_device_mapping.items():
+         if device and os.path.isfile(os.path.join(mountpoint, CONFIG_FILE_NAME)):
+            card_name = base_name = get_card_name(mountpoint, device)
+            suffix = 2
+            while card_name in card_names:
+               card_name, suffix = '{} ({})'.format(base_name, suffix), suffix + 1
+            card_names.add(card_name)
+            cards.append((mountpoint, device, card_name))
+      if not cards:
+         tk.Label(self.canvas, text='No A3EM cards were detected, insert the cards and scan for devices again').pack(fill=tk.BOTH, expand=True)
+         return
+      prompt_area = ttk.Frame(self.canvas)
+      prompt_area.place(relx=0.5, anchor=tk.N)
+      ttk.Label(prompt_area, text='Offload All Cards', font=('Helvetica', '14', 'bold')).grid(column=0, row=0, columnspan=5, pady=(20,20), sticky=tk.N+tk.S)
+      target_dir = tk.StringVar(prompt_area, get_offload_directory())
+      def choose_target_dir():
+         new_directory = filedialog.askdirectory(parent=self, title='Choose Offload Directory', initialdir=os.path.dirname(target_dir.get()))
+         if new_directory:
+            target_dir.set(new_directory)
+      ttk.Label(prompt_area, text='Target Directory').grid(column=0, row=1, columnspan=5, sticky=tk.W)
+      ttk.Entry(prompt_area, textvariable=target_dir, width=40).grid(column=0, row=2, columnspan=4, sticky=tk.W+tk.E)
+      ttk.Button(prompt_area, text='Browse', command=choose_target_dir).grid(column=4, row=2, sticky=tk.W+tk.E)
+      ttk.Separator(prompt_area, orient='horizontal').grid(column=0, row=3, pady=20, columnspan=5, sticky=tk.W+tk.E+tk.N+tk.S)
+      status_labels = {}
+      for row, (mountpoint, device, card_name) in enumerate(cards, start=4):
+         ttk.Label(prompt_area, text='{}  ({}, USB hub {})'.format(card_name, mountpoint, usb_hub_for_device(device))).grid(column=0, row=row, sticky=tk.W)
+         status_labels[mountpoint] = ttk.Label(prompt_area, text='Ready')
+         status_labels[mountpoint].grid(column=1, row=row, columnspan=4, padx=(20,0), sticky=tk.W)
+      total_label = ttk.Label(prompt_area, text='{:,} cards detected'.format(len(cards)))
+      total_label.grid(column=0, row=len(cards)+4, columnspan=5, pady=(20,5), sticky=tk.W)
+      button = ttk.Button(prompt_area, text='Start Offload')
+      button.configure(command=partial(self._start_batch_offload, cards, target_dir, status_labels, total_label, button))
+      button.grid(column=3, row=len(cards)+5, columnspan=2, pady=5, sticky=tk.W+tk.E+tk.N+tk.S)
+
+   def _run_batch_offload(self, updates, cards, cancel):
+      try:
+         results, elapsed_s = offload_cards(cards, progress=lambda results, elapsed_s: updates.put(('progress', (results, elapsed_s))), cancel=cancel)
+         updates.put(('done', (results, elapsed_s)))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _start_batch_offload(self, cards, target_dir, status_labels, total_label, button):
+      updates, cancel = queue.Queue(), threading.Event()
+      for status_label in status_labels.values():
+         status_label.configure(text='Waiting for the USB hub...')
+      button.configure(text='Cancel', command=cancel.set)
+      card_targets = [(mountpoint, device, os.path.join(target_dir.get(), card_name)) for mountpoint, device, card_name in cards]
+      threading.Thread(target=self._run_batch_offload, args=(updates, card_targets, cancel), daemon=True).start()
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_batch_offload, updates, cancel, cards, target_dir, status_labels, total_label, button)
+
+   def _poll_batch_offload(self, updates, cancel, cards, target_dir, status_labels, total_label, button):
+      if not total_label.winfo_exists():
+         cancel.set()
+         return
+      try:
+         while True:
+            status, details = updates.get_nowait()
+            if status == 'error':
+               button.configure(text='Start Offload', command=partial(self._start_batch_offload, cards, target_dir, status_labels, total_label, button))
+               total_label.configure(text='Offload failed')
+               tk.messagebox.showerror('A3EM Error', 'ERROR\n\nUnable to offload the detected cards to {}\n\n{}'.format(target_dir.get(), details))
+               return
+            results, elapsed_s = details
+            for mountpoint, result in results.items():
+               if result is not None:
+                  text = '{:,} of {:,} files copied, {:,} skipped'.format(result.files_copied, result.files_total - result.files_skipped - result.files_renamed, result.files_skipped)
+                  if status == 'done' and result.cancelled:
+                     text += ', cancelled'
+                  elif status == 'done':
+                     text += ', {:,} failed'.format(len(result.failed_files)) if result.failed_files else ', finished'
+                  status_labels[mountpoint].configure(text=text)
+            bytes_copied = sum(result.bytes_copied for result in results.values() if result is not None)
+            total_label.configure(text='{} {:,.2f} GB from {:,} cards in {:,.0f} seconds ({:,.1f} MB/s)'.format(
+                                  'Copied' if status == 'done' else 'Copying', bytes_copied / 1024 / 1024 / 1024, len(results), elapsed_s,
+                                  bytes_copied / 1024 / 1024 / max(elapsed_s, 1e-6)))
+            if status == 'done':
+               button.configure(text='Start Offload', command=partial(self._start_batch_offload, cards, target_dir, status_labels, total_label, button))
+               return
+      except queue.Empty:
+         pass
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_batch_offload, updates, cancel, cards, target_dir, status_labels, total_label, button)
+
+   def _estimate_clock_offset(self, updates):
+      try:
+         log_file_paths = sorted(os.path.join(directory, filename) for directory, _, filenames in os.walk(self.target_selection.get())
+                                 for filename in filenames if filename.endswith('.log'))
+         time_zone = read_device_timezone(os.path.join(self.target_selection.get(), CONFIG_FILE_NAME))
+         updates.put(('done', estimate_clock_offset(log_file_paths, time_zone) if log_file_paths else None))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _poll_clock_estimate(self, updates, estimate_label, anchor_rows, add_anchor_row, first_datetime, last_datetime):
+      if not estimate_label.winfo_exists():
+         return
+      try:
+         status, estimate = updates.get_nowait()
+      except queue.Empty:
+         self.after(SCAN_POLL_INTERVAL_MS, self._poll_clock_estimate, updates, estimate_label, anchor_rows, add_anchor_row, first_datetime, last_datetime)
+         return
+      if status != 'done' or estimate is None:
+         estimate_label.configure(text='Unable to estimate the clock offset: no GPS times were logged alongside the device timestamps')
+         return
+
+      # Pre-fill an anchor at the first clip, and another at the last clip when the clock drifted noticeably
+      estimate_label.configure(text=f'Estimated clock offset:  {estimate.offset_s:+,.1f} s  \u00b1 {estimate.offset_stderr_s:.2f} s,  ' +
+                                    f'drift {estimate.drift_s_per_day:+.2f} s/day  ({estimate.num_pairs:,} GPS times, {estimate.residual_rms_s:.2f} s RMS residual)')
+      anchor_times = [first_datetime or estimate.reference_time]
+      if last_datetime and abs(estimate.offset_at(last_datetime) - estimate.offset_at(anchor_times[0])) >= 1.0:
+         anchor_times.append(last_datetime)
+      while len(anchor_rows) < len(anchor_times):
+         add_anchor_row()
+      for (original_date, original_time, target_date, target_time), anchor_time in zip(anchor_rows, anchor_times):
+         target = anchor_time + timedelta(seconds=round(estimate.offset_at(anchor_time)))
+         original_date.set(anchor_time.strftime('%Y-%m-%d'))
+         original_time.set(anchor_time.strftime('%H:%M:%S'))
+         target_date.set(target.strftime('%Y-%m-%d'))
+         target_time.set(target.strftime('%H:%M:%S'))
+
+   def _check_audio_files(self, updates):
+      try:
+         with ClipManifest(self.target_selection.get()) as manifest:
+            manifest.update()
+            wav_paths = [path for path, _, _, _ in manifest.clips()]
+         updates.put(('checked', [(wav_path, problem) for wav_path, problem, _ in scan_wav_files(wav_paths) if problem]))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _repair_audio_files(self, updates, wav_paths):
+      try:
+         failed_paths = [wav_path for wav_path, repaired in repair_wav_files(wav_paths) if not repaired]
+
+         # Repairs rewrite the headers in place, so they must be read again on the next deployment scan
+         with ClipManifest(self.target_selection.get()) as manifest:
+            manifest.forget_headers(wav_paths)
+         updates.put(('repaired', failed_paths))
+      except Exception as error:
+         updates.put(('error', str(error)))
+
+   def _start_audio_repair(self, wav_paths, status_label, button):
+      updates = queue.Queue()
+      status_label.configure(text=f'Repairing {len(wav_paths):,} audio files, please wait...')
+      button.configure(state=['disabled'])
+      threading.Thread(target=self._repair_audio_files, args=(updates, wav_paths), daemon=True).start()
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_audio_repair, updates, status_label, button, len(wav_paths))
+
+   def _poll_audio_repair(self, updates, status_label, button, num_repairing=0):
+      if not status_label.winfo_exists():
+         return
+      try:
+         status, result = updates.get_nowait()
+      except queue.Empty:
+         self.after(SCAN_POLL_INTERVAL_MS, self._poll_audio_repair, updates, status_label, button, num_repairing)
+         return
+      if status == 'checked':
+         repairable = [wav_path for wav_path, problem in result if problem == WAV_SIZE_MISMATCH]
+         status_label.configure(text=f'Files with Mismatched Chunk Sizes:  {len(repairable):,}\n' +
+                                     f'Empty Files:  {sum(problem == WAV_EMPTY_FILE for _, problem in result):,}\n' +
+                                     f'Files with Unreadable Headers:  {sum(problem == WAV_UNREADABLE_HEADER for _, problem in result):,}')
+         if repairable:
+            button.configure(text=f'Repair {len(repairable):,} Files', state=['!disabled'], command=partial(self._start_audio_repair, repairable, status_label, button))
+      elif status == 'repaired':
+         status_label.configure(text=f'Repaired {num_repairing - len(result):,} audio files' + (f'\nUnable to repair {len(result):,} files' if result else ''))
+         button.configure(text='Repair')
+      else:
+         tk.messagebox.showerror('A3EM Error', 'ERROR\n\nUnable to check audio files on {}\n\n{}'.format(self.target_selection.get(), result))
+
    def _post_deployment_tools_start(self):
       self._clear_canvas()
-      tk.Label(self.canvas, text='Loading deployment details, please wait...').pack(fill=tk.BOTH, expand=True)
-      deployment_parsing_thread = threading.Thread(target=self._post_deployment_tools)
+      updates, cancel = queue.Queue(), threading.Event()
+      prompt_area = ttk.Frame(self.canvas)
+      prompt_area.place(relx=0.5, rely=0.4, anchor=tk.CENTER)
+      ttk.Label(prompt_area, text='Loading deployment details, please wait...').pack(pady=(0,10))
+      progress_label = ttk.Label(prompt_area, text='Scanning audio clips...', justify=tk.CENTER)
+      progress_label.pack(pady=(0,10))
+      ttk.Button(prompt_area, text='Cancel', command=cancel.set).pack()
+      deployment_parsing_thread = threading.Thread(target=self._scan_deployment, args=(updates, cancel), daemon=True)
       deployment_parsing_thread.start()
+      self.after(SCAN_POLL_INTERVAL_MS, self._poll_deployment_scan, updates, cancel, progress_label)
 
    def _configure(self):
       self._clear_canvas()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# PYTHON INCLUSIONS ---------------------------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+import hashlib, json, os, queue, re, sqlite3, sys, threading, time
+try: from .clip_manifest import walk_clip_tree
+except: from clip_manifest import walk_clip_tree
+
+
+# CONSTANTS AND DEFINITIONS -------------------------------------------------------------------------------------------
+
+OFFLOAD_MANIFEST_NAME = '_a3em_offload.db'
+OFFLOAD_MANIFEST_VERSION = 3
+OFFLOAD_EXCLUDED_PREFIXES = ('_a3em_manifest.db', OFFLOAD_MANIFEST_NAME)
+PARTIAL_FILE_SUFFIX = '.part'
+RENAMING_FILE_SUFFIX = '.renaming'
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+DEFAULT_OFFLOAD_WORKERS = 2
+DEFAULT_LISTING_WORKERS = 8
+PROGRESS_INTERVAL_S = 0.25
+DEFAULT_READERS_PER_HUB = 2
+DEFAULT_VERIFY_WORKERS = min(os.cpu_count() or 4, 8)
+HASH_READ_AHEAD_CHUNKS = 4
+VERIFICATION_REPORT_NAME = 'verification_report.json'
+SHARED_BUS_NAME = 'shared'
+USB_PORT_PATTERN = re.compile(r'^[0-9]+-[0-9]+(\.[0-9]+)*$')
+
+
+# STORAGE CLASSES -----------------------------------------------------------------------------------------------------
+
+@dataclass
+class OffloadResult:
+   files_total: int = 0
+   files_copied: int = 0
+   files_skipped: int = 0
+   files_renamed: int = 0
+   bytes_total: int = 0
+   bytes_copied: int = 0
+   elapsed_s: float = 0.0
+   failed_files: list = field(default_factory=list)
+   cancelled: bool = False
+
+@dataclass
+class VerificationResult:
+   files_total: int = 0
+   files_verified: int = 0
+   bytes_total: int = 0
+   bytes_verified: int = 0
+   elapsed_s: float = 0.0
+   mismatched_files: list = field(default_factory=list)
+   missing_files: list = field(default_factory=list)
+   unreadable_files: list = field(default_factory=list)
+   cancelled: bool = False
+
+
+# FILE COPYING FUNCTIONS ----------------------------------------------------------------------------------------------
+
+def _list_offload_directory(card_root, directory):
+   subdirectories, files = [], []
+   with os.scandir(os.path.join(card_root, directory)) as entries:
+      for entry in entries:
+         relative_path = os.path.join(directory, entry.name) if directory else entry.name
+         if entry.is_dir():
+            subdirectories.append((relative_path, entry.stat().st_mtime_ns))
+         elif not entry.name.startswith(OFFLOAD_EXCLUDED_PREFIXES):
+            info = entry.stat()
+            files.append((relative_path, info.st_size, info.st_mtime_ns))
+   return subdirectories, files
+
+def _list_card_files(card_root, max_workers=DEFAULT_LISTING_WORKERS):
+
+   # Firmware does not reliably update directory modification times, so every directory is listed on every offload
+   files = []
+   for _, _, _, directory_files in walk_clip_tree(card_root, None, max_workers, _list_offload_directory):
+      files.extend(directory_files)
+   return sorted(files)
+
+def copy_and_hash_file(source_path, target_path, buffer_size=COPY_BUFFER_SIZE):
+   hasher, buffer = hashlib.blake2b(), bytearray(buffer_size)
+   view, partial_path = memoryview(buffer), target_path + PARTIAL_FILE_SUFFIX
+   os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+   # Stream the file through a single reusable buffer, hashing exactly the bytes that are written
+   with open(source_path, 'rb', buffering=0) as source, open(partial_path, 'wb', buffering=0) as target:
+      while True:
+         num_bytes = source.readinto(buffer)
+         if not num_bytes:
+            break
+         hasher.update(view[:num_bytes])
+         written = 0
+         while written < num_bytes:
+            written += target.write(view[written:num_bytes])
+      os.fsync(target.fileno())
+      info = os.fstat(source.fileno())
+
+   # Only expose the copy under its real name once it is complete
+   os.utime(partial_path, ns=(info.st_atime_ns, info.st_mtime_ns))
+   os.replace(partial_path, target_path)
+   return hasher.hexdigest()
+
+
+# MANIFEST CLASS ------------------------------------------------------------------------------------------------------
+
+class OffloadManifest:
+
+   def __init__(self, target_dir):
+      os.makedirs(target_dir, exist_ok=True)
+      self.connection = sqlite3.connect(os.path.join(target_dir, OFFLOAD_MANIFEST_NAME))
+      if self.connection.execute('PRAGMA user_version').fetchone()[0] != OFFLOAD_MANIFEST_VERSION:
+         self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL, copied_at REAL NOT NULL);
+            DROP TABLE IF EXISTS directories;
+            PRAGMA user_version = {};'''.format(OFFLOAD_MANIFEST_VERSION))
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+
+   def completed_files(self):
+      return {path: (size, mtime_ns, file_hash) for path, size, mtime_ns, file_hash in self.connection.execute('SELECT path, size, mtime_ns, hash FROM files')}
+
+   def record(self, entries, removed_paths=()):
+      with self.connection:
+         self.connection.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in removed_paths])
+         self.connection.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)', entries)
+
+   def close(self):
+      self.connection.close()
+
+
+# OFFLOAD FUNCTIONS ---------------------------------------------------------------------------------------------------
+
+def offload_card(card_root, target_dir, max_workers=DEFAULT_OFFLOAD_WORKERS, progress=None, cancel=None):
+   result, start_time, last_progress = OffloadResult(), time.monotonic(), time.monotonic()
+   with OffloadManifest(target_dir) as manifest:
+
+      # Skip every file that an earlier offload already copied and hashed, as long as it is unchanged on both sides
+      completed, pending = manifest.completed_files(), []
+      card_files = _list_card_files(card_root)
+      for relative_path, size, mtime_ns in card_files:
+         result.files_total += 1
+         result.bytes_total += size
+         target_path = os.path.join(target_dir, relative_path)
+         if completed.get(relative_path, (None, None))[:2] == (size, mtime_ns) and os.path.isfile(target_path) and os.path.getsize(target_path) == size:
+            result.files_skipped += 1
+         else:
+            pending.append((relative_path, size, mtime_ns))
+
+      # Clips that were only renamed on the card, e.g. by relabeling, can be renamed in the archive instead of copied again,
+      # matching against every record the card no longer satisfies since a relabel may reuse the name of another clip
+      card_files_by_path = {relative_path: (size, mtime_ns) for relative_path, size, mtime_ns in card_files}
+      unsatisfied = {}
+      for relative_path, (size, mtime_ns, file_hash) in completed.items():
+         if card_files_by_path.get(relative_path) != (size, mtime_ns):
+            unsatisfied.setdefault((size, mtime_ns), []).append((relative_path, file_hash))
+      moves, unmatched = [], []
+      for relative_path, size, mtime_ns in pending:
+         candidates = unsatisfied.get((size, mtime_ns), [])
+         old_target_path = os.path.join(target_dir, candidates[0][0]) if len(candidates) == 1 else None
+         if old_target_path and os.path.isfile(old_target_path) and os.path.getsize(old_target_path) == size:
+            old_path, file_hash = candidates.pop()
+            moves.append((old_path, relative_path, size, mtime_ns, file_hash))
+         else:
+            unmatched.append((relative_path, size, mtime_ns))
+
+      # Move every matched file aside before moving any into place so that chains and cycles of renames cannot overwrite each other
+      staged = []
+      for old_path, relative_path, size, mtime_ns, file_hash in moves:
+         staged_path = os.path.join(target_dir, old_path) + RENAMING_FILE_SUFFIX
+         os.replace(os.path.join(target_dir, old_path), staged_path)
+         staged.append(staged_path)
+      renamed, removed_paths = [], []
+      for staged_path, (old_path, relative_path, size, mtime_ns, file_hash) in zip(staged, moves):
+         target_path = os.path.join(target_dir, relative_path)
+         os.makedirs(os.path.dirname(target_path), exist_ok=True)
+         os.replace(staged_path, target_path)
+         try: os.removedirs(os.path.dirname(staged_path))
+         except OSError: pass
+         renamed.append((relative_path, size, mtime_ns, file_hash, time.time()))
+         removed_paths.append(old_path)
+         result.files_renamed += 1
+      manifest.record(renamed, removed_paths)
+      pending = unmatched
+
+      # Keep only a few copies in flight at once so that the card reader sees mostly sequential reads
+      with ThreadPoolExecutor(max_workers=max_workers) as executor:
+         pending_files, in_flight, finished = iter(pending), {}, []
+         while True:
+            while len(in_flight) < 2 * max_workers and (cancel is None or not cancel.is_set()):
+               relative_path, size, mtime_ns = next(pending_files, (None, None, None))
+               if relative_path is None:
+                  break
+               future = executor.submit(copy_and_hash_file, os.path.join(card_root, relative_path), os.path.join(target_dir, relative_path))
+               in_flight[future] = (relative_path, size, mtime_ns)
+            if not in_flight:
+               break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+               relative_path, size, mtime_ns = in_flight.pop(future)
+               try:
+                  finished.append((relative_path, size, mtime_ns, future.result(), time.time()))
+                  result.files_copied += 1
+                  result.bytes_copied += size
+               except OSError as error:
+                  result.failed_files.append((relative_path, str(error)))
+
+            # Commit finished files to the manifest in batches so that an interruption loses little work
+            if time.monotonic() - last_progress >= PROGRESS_INTERVAL_S:
+               manifest.record(finished)
+               finished.clear()
+               if progress is not None:
+                  progress(result)
+               last_progress = time.monotonic()
+         manifest.record(finished)
+   result.cancelled = cancel is not None and cancel.is_set()
+   result.elapsed_s = time.monotonic() - start_time
+   return result
+
+
+# BATCH OFFLOAD FUNCTIONS ---------------------------------------------------------------------------------------------
+
+def usb_hub_for_device(device):
+   if not device or not sys.platform.startswith('linux'):
+      return SHARED_BUS_NAME
+
+   # Block devices resolve to a sysfs path through their USB ports, e.g. .../usb2/2-1/2-1.3/2-1.3:1.0/host6/.../sdb/sdb1
+   ports = [part for part in os.path.realpath(os.path.join('/sys/class/block', os.path.basename(device))).split(os.sep) if USB_PORT_PATTERN.match(part)]
+   if not ports:
+      return SHARED_BUS_NAME
+   bus, _, port_chain = ports[-1].partition('-')
+   return '{}-{}'.format(bus, port_chain.rpartition('.')[0]) if '.' in port_chain else 'usb' + bus
+
+def offload_cards(cards, max_readers_per_hub=DEFAULT_READERS_PER_HUB, progress=None, cancel=None):
+   hubs = {card_root: usb_hub_for_device(device) for card_root, device, _ in cards}
+   readers = {hub: threading.BoundedSemaphore(max_readers_per_hub) for hub in hubs.values()}
+   results, lock, start_time = {card_root: None for card_root, _, _ in cards}, threading.Lock(), time.monotonic()
+
+   def report(card_root, result):
+      with lock:
+         results[card_root] = result
+         snapshot = dict(results)
+      if progress is not None:
+         progress(snapshot, time.monotonic() - start_time)
+
+   # Every card gets its own worker, but only a few cards behind the same USB hub are read at once
+   def offload(card_root, device, target_dir):
+      with readers[hubs[card_root]]:
+         if cancel is not None and cancel.is_set():
+            result = OffloadResult(cancelled=True)
+         else:
+            try: result = offload_card(card_root, target_dir, progress=partial(report, card_root), cancel=cancel)
+            except OSError as error: result = OffloadResult(failed_files=[(card_root, str(error))])
+      report(card_root, result)
+
+   with ThreadPoolExecutor(max_workers=max(len(cards), 1)) as executor:
+      for future in [executor.submit(offload, *card) for card in cards]:
+         future.result()
+   return results, time.monotonic() - start_time
+
+
+# VERIFICATION FUNCTIONS ----------------------------------------------------------------------------------------------
+
+def hash_file(file_path, chunk_size=COPY_BUFFER_SIZE):
+   hasher = hashlib.blake2b()
+   with open(file_path, 'rb', buffering=0) as file:
+      if os.fstat(file.fileno()).st_size <= chunk_size:
+         hasher.update(file.read())
+         return hasher.hexdigest()
+
+      # Read ahead on a helper thread while this one hashes, so that disk reads and hashing overlap
+      chunks = queue.Queue(maxsize=HASH_READ_AHEAD_CHUNKS)
+      def read_chunks():
+         try:
+            while True:
+               chunk = file.read(chunk_size)
+               chunks.put(chunk)
+               if not chunk:
+                  break
+         except OSError as error:
+            chunks.put(error)
+      reader = threading.Thread(target=read_chunks, daemon=True)
+      reader.start()
+      while True:
+         chunk = chunks.get()
+         if isinstance(chunk, OSError):
+            raise chunk
+         if not chunk:
+            break
+         hasher.update(chunk)
+      reader.join()
+   return hasher.hexdigest()
+
+def _hash_or_error(file_path):
+   try: return hash_file(file_path), None
+   except FileNotFoundError: return None, 'missing'
+   except OSError as error: return None, str(error)
+
+def verify_offload(card_root, target_dir, max_workers=DEFAULT_VERIFY_WORKERS, progress=None, cancel=None):
+   result, start_time, last_progress = VerificationResult(), time.monotonic(), time.monotonic()
+   card_files = sorted(file for _, _, _, files in walk_clip_tree(card_root, list_directory=_list_offload_directory) for file in files)
+   result.files_total, result.bytes_total = len(card_files), sum(size for _, size, _ in card_files)
+   report_files = []
+
+   # Hash the card and the archive copy of each file at the same time, with separate pools so the card keeps sequential reads
+   with ThreadPoolExecutor(max_workers=DEFAULT_OFFLOAD_WORKERS) as card_executor, ThreadPoolExecutor(max_workers=max_workers) as archive_executor:
+      pending_files, in_flight = iter(card_files), {}
+      while True:
+         while len(in_flight) < 2 * DEFAULT_OFFLOAD_WORKERS and (cancel is None or not cancel.is_set()):
+            relative_path, size, mtime_ns = next(pending_files, (None, None, None))
+            if relative_path is None:
+               break
+            card_future = card_executor.submit(_hash_or_error, os.path.join(card_root, relative_path))
+            archive_future = archive_executor.submit(_hash_or_error, os.path.join(target_dir, relative_path))
+            in_flight[card_future] = (relative_path, size, archive_future)
+         if not in_flight:
+            break
+         done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+         for card_future in done:
+            relative_path, size, archive_future = in_flight.pop(card_future)
+            (card_hash, card_error), (archive_hash, archive_error) = card_future.result(), archive_future.result()
+            if card_error:
+               status = 'unreadable'
+               result.unreadable_files.append((relative_path, card_error))
+            elif archive_error == 'missing':
+               status = 'missing'
+               result.missing_files.append(relative_path)
+            elif archive_error:
+               status = 'unreadable'
+               result.unreadable_files.append((relative_path, archive_error))
+            elif card_hash != archive_hash:
+               status = 'mismatch'
+               result.mismatched_files.append(relative_path)
+            else:
+               status = 'verified'
+               result.files_verified += 1
+               result.bytes_verified += size
+            report_files.append({'path': relative_path, 'size': size, 'card_hash': card_hash, 'archive_hash': archive_hash, 'status': status})
+         if progress is not None and time.monotonic() - last_progress >= PROGRESS_INTERVAL_S:
+            progress(result)
+            last_progress = time.monotonic()
+   result.cancelled = cancel is not None and cancel.is_set()
+   result.elapsed_s = time.monotonic() - start_time
+
+   # Leave a machine-readable record of the verification in the root of the archive
+   report = {'card_root': os.path.abspath(card_root), 'archive_dir': os.path.abspath(target_dir), 'hash_algorithm': 'blake2b',
+             'verified_at': datetime.now().astimezone().isoformat(timespec='seconds'), 'elapsed_s': round(result.elapsed_s, 3),
+             'complete': not result.cancelled, 'files_total': result.files_total, 'files_verified': result.files_verified,
+             'bytes_total': result.bytes_total, 'bytes_verified': result.bytes_verified, 'num_mismatched': len(result.mismatched_files),
+             'num_missing': len(result.missing_files), 'num_unreadable': len(result.unreadable_files), 'files': sorted(report_files, key=lambda file: file['path'])}
+   os.makedirs(target_dir, exist_ok=True)
+   with open(os.path.join(target_dir, VERIFICATION_REPORT_NAME + PARTIAL_FILE_SUFFIX), 'w') as file:
+      json.dump(report, file, indent=1)
+   os.replace(os.path.join(target_dir, VERIFICATION_REPORT_NAME + PARTIAL_FILE_SUFFIX), os.path.join(target_dir, VERIFICATION_REPORT_NAME))
+   return result
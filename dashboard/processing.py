@@ -3,9 +3,59 @@
 
 # PYTHON INCLUSIONS ---------------------------------------------------------------------------------------------------
 
-from collections import defaultdict
-import json, struct, time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+import fnmatch, functools, hashlib, heapq, mmap, os, re, struct, time, warnings
+import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
+try: from .clip_manifest import ClipManifest
+except: from clip_manifest import ClipManifest
+try: from .relabel_logs import read_log_offset, log_offsets_at
+except: from relabel_logs import read_log_offset, log_offsets_at
+
+
+# CONSTANTS AND DEFINITIONS -------------------------------------------------------------------------------------------
+
+CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.a3em', 'cache')
+CACHE_SIZE_LIMIT = 2 * 1024 * 1024 * 1024
+IMU_PARSER_VERSION = 1
+LOG_CHECKPOINT_VERSION = 3
+LOG_FINGERPRINT_LENGTH = 4096
+
+CONFIG_FILE_NAME = '_a3em.cfg'
+LOG_FILE_PATTERN = '*.log'
+IMU_FILE_PATTERN = '*.imu'
+DEFAULT_GAP_THRESHOLD_S = 3600
+MAX_REPORTED_GAPS = 10
+
+DEFAULT_PLOT_POINTS = 4000
+
+IMU_HEADER_LENGTH = 8
+IMU_BLOCK_SIZE = 65536
+IMU_SAMPLE_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4')])
+
+DEVICE_DETAILS_HEADER = 'Current Device Details'
+DETAIL_VALUE_WIDTH = 64
+DETAIL_SCAN_CHUNK_SIZE = 1 << 21
+VALUE_WORD_MASKS = np.array([(1 << (8 * length)) - 1 for length in range(9)], dtype=np.uint64)
+BLANK_WORD = np.uint64(int.from_bytes(b' ' * 8, 'little'))
+DEVICE_DETAIL_FIELDS = ((b'UTC Timestamp', 't'), (b'Voltage', 'voltage'), (b'Temperature', 'temp'), (b'Location', ('lat', 'lon', 'ht')))
+DEVICE_INTEGER_COLUMNS = ('t', 'voltage')
+GPS_TIMESTAMP_COLUMN = 'gps_timestamp'
+CLOCK_OUTLIER_SIGMAS = 3.0
+
+_NUMBER = rb'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+DEVICE_DETAILS_PATTERN = re.compile(
+	DEVICE_DETAILS_HEADER.encode() + rb'[^\n]*\n(?P<body>(?:(?:[ \t]*(?:'
+	rb'UTC Timestamp[ \t]*:[ \t]*(?P<t>\d+)[ \t\r]*'
+	rb'|Voltage[ \t]*:[ \t]*(?P<voltage>-?\d+)[ \t\r]*'
+	rb'|Temperature[ \t]*:[ \t]*(?P<temp>' + _NUMBER + rb')[ \t\r]*'
+	rb'|Location[ \t]*:[ \t]*\[[ \t]*(?P<lat>' + _NUMBER + rb')[ \t]*,[ \t]*(?P<lon>' + _NUMBER + rb')[ \t]*,[ \t]*(?P<ht>' + _NUMBER + rb')[ \t]*\][ \t\r]*)'
+	rb'|[ \t]+(?P<extra>(?!' + DEVICE_DETAILS_HEADER.encode() + rb')[^\n:]*:[^\n]*)'
+	rb')(?:\n|\Z))*)')
 
 
 # PANDAS DISPLAY OPTIONS ----------------------------------------------------------------------------------------------
@@ -15,120 +65,749 @@ pd.options.display.float_format = '{:.2f}'.format
 pd.set_option('display.max_rows', None)
 
 
+# STORAGE CLASSES -----------------------------------------------------------------------------------------------------
+
+@dataclass
+class DeploymentStatistics:
+	start_time: int = None
+	end_time: int = None
+	uptime_s: int = 0
+	num_detail_records: int = 0
+	voltage_min: int = None
+	voltage_mean: float = None
+	voltage_max: int = None
+	voltage_slope_mv_per_day: float = None
+	temperature_min: float = None
+	temperature_max: float = None
+	gps_fix_count: int = 0
+	log_gaps: list = field(default_factory=list)
+	clip_count: int = 0
+	clip_bytes: int = 0
+	first_clip_time: datetime = None
+	last_clip_time: datetime = None
+	clip_gaps: list = field(default_factory=list)
+	imu_file_count: int = 0
+	imu_sample_count: int = 0
+	imu_duration_s: float = 0.0
+	unreadable_imu_files: list = field(default_factory=list)
+
+@dataclass
+class ClockOffsetEstimate:
+	offset_s: float
+	drift_s_per_day: float
+	reference_time: datetime
+	offset_stderr_s: float
+	residual_rms_s: float
+	num_pairs: int
+
+	def offset_at(self, clip_time):
+		return self.offset_s + self.drift_s_per_day * (clip_time - self.reference_time).total_seconds() / 86400.0
+
+
+# CACHING FUNCTIONS ---------------------------------------------------------------------------------------------------
+
+def _evict_cache():
+
+	# Other processes may rename or evict entries at any time, and their in-progress temporary files are not ours to remove
+	entries = []
+	for entry in os.scandir(CACHE_DIRECTORY):
+		if entry.name.endswith('.tmp'):
+			continue
+		try:
+			if entry.is_file():
+				info = entry.stat()
+				entries.append((info.st_mtime, info.st_size, entry.path))
+		except OSError:
+			continue
+	total_size = sum(size for _, size, _ in entries)
+	for _, size, path in sorted(entries):
+		if total_size <= CACHE_SIZE_LIMIT:
+			break
+		try:
+			os.remove(path)
+			total_size -= size
+		except OSError:
+			continue
+
+def _cache_path(file_path, parser_name, parser_version):
+	info = os.stat(file_path)
+	key = '{}|{}|{}|{}|{}'.format(os.path.abspath(file_path), info.st_size, info.st_mtime_ns, parser_name, parser_version)
+	return os.path.join(CACHE_DIRECTORY, hashlib.sha1(key.encode()).hexdigest() + '.npz')
+
+def _load_cached_frame(cache_path):
+	try:
+		with np.load(cache_path, allow_pickle=False) as cached:
+			index_name = str(cached['index_name']) or None
+			frame = pd.DataFrame({column: cached['column_{}'.format(i)] for i, column in enumerate(cached['columns'])},
+			                     index=pd.Index(cached['index'], name=index_name))
+		os.utime(cache_path)
+		return frame
+	except Exception:
+		return None
+
+def _store_cached_frame(cache_path, frame):
+	temporary_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+	try:
+		os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+		with open(temporary_path, 'wb') as file:
+			np.savez(file, index=frame.index.to_numpy(), index_name=np.array(frame.index.name or ''), columns=np.array(frame.columns, dtype=str),
+			         **{'column_{}'.format(i): frame[column].to_numpy() for i, column in enumerate(frame.columns)})
+		os.replace(temporary_path, cache_path)
+		_evict_cache()
+	except OSError:
+
+		# The cache is only an optimization, so a failure to store or evict never loses the parsed frame
+		try: os.remove(temporary_path)
+		except OSError: pass
+
+def _cached_parser(parser_version):
+	def decorator(parser):
+		@functools.wraps(parser)
+		def cached_parser(file_path, use_cache=True):
+			if not use_cache:
+				return parser(file_path)
+			cache_path = _cache_path(file_path, parser.__name__, parser_version)
+			frame = _load_cached_frame(cache_path)
+			if frame is None:
+				frame = parser(file_path)
+				_store_cached_frame(cache_path, frame)
+			return frame
+		return cached_parser
+	return decorator
+
+
+# PLOTTING FUNCTIONS --------------------------------------------------------------------------------------------------
+
+def downsample_min_max(values, num_buckets):
+	num_values = len(values)
+	if num_buckets <= 0 or 2 * num_buckets >= num_values:
+		return np.arange(num_values)
+	bucket_size = num_values // num_buckets
+	values = np.asarray(values, dtype=np.float64)
+	num_bucketed = bucket_size * num_buckets
+
+	# Sparse columns leave whole buckets empty, so search with NaNs masked out and drop the buckets that hold none
+	present = ~np.isnan(values)
+	low_values, high_values = np.where(present, values, np.inf), np.where(present, values, -np.inf)
+	bucket_present = present[:num_bucketed].reshape(num_buckets, bucket_size).any(axis=1)
+	offsets = np.arange(num_buckets) * bucket_size
+	indices = [(offsets + np.argmin(low_values[:num_bucketed].reshape(num_buckets, bucket_size), axis=1))[bucket_present],
+	           (offsets + np.argmax(high_values[:num_bucketed].reshape(num_buckets, bucket_size), axis=1))[bucket_present]]
+	if num_values > num_bucketed and present[num_bucketed:].any():
+		indices.append(num_bucketed + np.array([np.argmin(low_values[num_bucketed:]), np.argmax(high_values[num_bucketed:])]))
+	return np.unique(np.concatenate(indices))
+
+def downsample_lttb(x, y, num_points):
+	num_values = len(x)
+	if num_points < 3 or num_points >= num_values:
+		return np.arange(num_values)
+	x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+	edges = np.linspace(1, num_values - 1, num_points - 1).astype(np.int64)
+	selected = np.empty(num_points, dtype=np.int64)
+	selected[0], selected[-1] = 0, num_values - 1
+	for bucket in range(num_points - 2):
+		start, end = edges[bucket], edges[bucket + 1]
+		next_end = edges[bucket + 2] if bucket + 2 < len(edges) else num_values
+		average_x, average_y = x[end:next_end].mean(), y[end:next_end].mean()
+		anchor = selected[bucket]
+		areas = np.abs((x[anchor] - average_x) * (y[start:end] - y[anchor]) - (x[anchor] - x[start:end]) * (average_y - y[anchor]))
+		selected[bucket + 1] = start + np.argmax(areas)
+	return selected
+
+def plot_time_series(series, title, labels=None, start=None, end=None, max_points=DEFAULT_PLOT_POINTS, method='minmax'):
+	labels = labels or {}
+	window = series.loc[start:end]
+	x = window.index.to_numpy()
+	figure = go.Figure()
+
+	# Only numeric columns can be plotted, and each one is downsampled over just the samples where it holds a value
+	for column in window.columns:
+		if not pd.api.types.is_numeric_dtype(window[column]):
+			continue
+		y = window[column].to_numpy(dtype=np.float64, na_value=np.nan)
+		present = ~np.isnan(y)
+		column_x, y = x[present], y[present]
+		indices = downsample_lttb(column_x, y, max_points) if method == 'lttb' else downsample_min_max(y, max_points // 2)
+		figure.add_trace(go.Scattergl(x=column_x[indices], y=y[indices], mode='lines', name=str(column)))
+	figure.update_layout(title=title, template='simple_white', legend_title_text=labels.get('variable'),
+	                     xaxis_title=labels.get(window.index.name, window.index.name), yaxis_title=labels.get('value'))
+	return figure
+
+
 # PROCESSING FUNCTIONS ------------------------------------------------------------------------------------------------
 
-def get_imu_data(imu_data_path):
-	imu_data = defaultdict(dict)
+def read_imu_header(imu_data_path):
 	with open(imu_data_path, 'rb') as file:
-		i = 8
-		data = file.read()
-		sample_rate = struct.unpack('<I', data[0:4])[0]
-		timestamp = float(struct.unpack('<I', data[4:8])[0])
-		delta_time_s = 1.0 / float(sample_rate)
-		while i + 12 <= len(data):
-			imu_data[timestamp]['x'] = struct.unpack('f', data[i:i+4])[0]
-			imu_data[timestamp]['y'] = struct.unpack('f', data[i+4:i+8])[0]
-			imu_data[timestamp]['z'] = struct.unpack('f', data[i+8:i+12])[0]
-			timestamp += delta_time_s
-			i += 12
-	imu_data = [dict({'t': ts}, **datum) for ts, datum in imu_data.items()]
-	imu_data = pd.json_normalize(data=imu_data).groupby('t').first()
-	imu_data.plot(title='IMU Data Time Series', template='simple_white', labels=dict(t='Timestamp', value='Acceleration (in mgs)', variable='Axis')).show()
+		sample_rate, timestamp = struct.unpack('<II', file.read(IMU_HEADER_LENGTH))
+	return sample_rate, float(timestamp)
+
+@_cached_parser(IMU_PARSER_VERSION)
+def decode_imu_data(imu_data_path):
+	sample_rate, timestamp = read_imu_header(imu_data_path)
+	num_samples = max(os.path.getsize(imu_data_path) - IMU_HEADER_LENGTH, 0) // IMU_SAMPLE_DTYPE.itemsize
+	if num_samples > 0:
+		samples = np.memmap(imu_data_path, dtype=IMU_SAMPLE_DTYPE, mode='r', offset=IMU_HEADER_LENGTH, shape=(num_samples,))
+	else:
+		samples = np.zeros(0, dtype=IMU_SAMPLE_DTYPE)
+	timestamps = timestamp + np.arange(num_samples, dtype=np.float64) * (1.0 / float(sample_rate))
+	imu_data = pd.DataFrame({axis: np.array(samples[axis], dtype=np.float32) for axis in IMU_SAMPLE_DTYPE.names},
+	                        index=pd.Index(timestamps, name='t'))
+	del samples
 	return imu_data
 
-def get_voltage_time_series(log_file_path):
-	details = defaultdict(dict)
-	with open(log_file_path, 'r') as file:
-		in_details = False
-		timestamp = 0
-		voltage = 0
-		for line in file:
-			if 'Current Device Details' in line:
-				in_details = True
-			elif in_details and 'UTC Timestamp' in line:
-				timestamp = int(line.split(':')[1].strip())
-			elif in_details and 'Voltage' in line:
-				voltage = int(line.split(':')[1].strip())
-			if in_details and timestamp > 0 and voltage > 0:
-				details[timestamp]['voltage'] = voltage
-				timestamp = voltage = 0
-				in_details = False
-	details = [dict({'t': ts}, **datum) for ts, datum in details.items()]
-	details = pd.json_normalize(data=details).groupby('t').first()
+def iter_imu_data(imu_data_path, block_size=IMU_BLOCK_SIZE):
+	sample_rate, timestamp = read_imu_header(imu_data_path)
+	delta_time_s = 1.0 / float(sample_rate)
+	block_bytes = block_size * IMU_SAMPLE_DTYPE.itemsize
+	with open(imu_data_path, 'rb') as file:
+		file.seek(IMU_HEADER_LENGTH)
+		sample_index = 0
+		while True:
+			data = file.read(block_bytes)
+			num_samples = len(data) // IMU_SAMPLE_DTYPE.itemsize
+			if num_samples == 0:
+				break
+			samples = np.frombuffer(data, dtype=IMU_SAMPLE_DTYPE, count=num_samples)
+			timestamps = timestamp + np.arange(sample_index, sample_index + num_samples, dtype=np.float64) * delta_time_s
+			yield pd.DataFrame({axis: samples[axis].astype(np.float32) for axis in IMU_SAMPLE_DTYPE.names},
+			                   index=pd.Index(timestamps, name='t'))
+			sample_index += num_samples
+			if len(data) < block_bytes:
+				break
+
+def get_imu_data(imu_data_path):
+	imu_data = decode_imu_data(imu_data_path)
+	plot_time_series(imu_data, 'IMU Data Time Series', labels=dict(t='Timestamp', value='Acceleration (in mgs)', variable='Axis')).show()
+	return imu_data
+
+def _parse_detail_value(value):
+	for parser in (int, float):
+		try: return parser(value)
+		except ValueError: continue
+	return value
+
+def _parse_detail_row(row, values_per_row, parser=float):
+	try: values = [parser(value) for value in row.split()]
+	except ValueError: values = []
+	return values if len(values) == values_per_row else [np.nan] * values_per_row
+
+def _skip_blanks(buffer, positions):
+	characters = buffer[positions]
+	blank = (characters == ord(' ')) | (characters == ord('\t'))
+	positions, moving = positions + blank, np.flatnonzero(blank)
+	while len(moving):
+		characters = buffer[positions[moving]]
+		moving = moving[(characters == ord(' ')) | (characters == ord('\t'))]
+		positions[moving] += 1
+	return positions
+
+def _words_at(buffer, positions):
+
+	# Read the eight bytes starting at each position as one little-endian word, so that text can be compared and copied a word at a time
+	return np.ndarray((len(buffer) - 7,), dtype='<u8', buffer=buffer, strides=(1,))[positions]
+
+def _word_pattern(text):
+	return np.uint64(int.from_bytes(text, 'little')), np.uint64((1 << (8 * len(text))) - 1)
+
+def _lines_starting_with(buffer, text_starts, first_characters, prefix):
+	lines = np.flatnonzero(first_characters == prefix[0])
+	for offset in range(0, len(prefix), 8):
+		expected, mask = _word_pattern(prefix[offset:offset + 8])
+		lines = lines[(_words_at(buffer, text_starts[lines] + offset) & mask) == expected]
+	return lines
+
+def _gather_values(buffer, value_starts, value_ends):
+
+	# Copy each value into a blank-padded row of a matrix a word at a time, masking off whatever follows the value
+	# and leaving out any value too long to be one of the logged numbers
+	lengths = value_ends - value_starts
+	rows = np.flatnonzero(lengths < DETAIL_VALUE_WIDTH)
+	value_starts, lengths = value_starts[rows], lengths[rows]
+	words = []
+	for offset in range(0, int(lengths.max(initial=0)) + 1, 8):
+		kept = VALUE_WORD_MASKS[np.clip(lengths - offset, 0, 8)]
+		words.append((_words_at(buffer, value_starts + offset) & kept) | (BLANK_WORD & ~kept))
+	return rows, np.stack(words, axis=1).view(np.uint8)
+
+def _parse_numbers(text, count, dtypes):
+
+	# A text without any number in it still parses as a single zero
+	if count == 1 and not np.any(text > ord(' ')):
+		return None
+	with warnings.catch_warnings():
+		warnings.simplefilter('error', DeprecationWarning)
+		for dtype in dtypes:
+			try:
+				values = np.fromstring(text.tobytes(), dtype=dtype, sep=' ')
+			except (ValueError, DeprecationWarning):
+				continue
+			if len(values) == count:
+				return values
+	return None
+
+def _parse_detail_numbers(num_rows, rows, text, values_per_row=1, parser=float):
+
+	# Parse all values in one call, as integers where possible, then again without the empty values if the count
+	# is off, and only fall back to parsing row by row when some value is not a plain number
+	numbers = np.full((num_rows, values_per_row), np.nan)
+	dtypes = (np.int64,) if parser is int else (np.int64, np.float64)
+	values = _parse_numbers(text, len(rows) * values_per_row, dtypes)
+	if values is None:
+		filled = np.flatnonzero(np.any(text > ord(' '), axis=1))
+		rows, text = rows[filled], text[filled]
+		values = _parse_numbers(text, len(rows) * values_per_row, dtypes)
+	if values is not None:
+		numbers[rows] = values.reshape(-1, values_per_row)
+		return numbers
+	for row, row_text in zip(rows, text):
+		numbers[row] = _parse_detail_row(row_text.tobytes(), values_per_row, parser)
+	return numbers
+
+def _parse_location_values(num_rows, rows, text):
+
+	# Turn each "[lat, lon, ht]" into three blank-separated numbers, leaving out locations that are not in that form
+	nonblank, row_numbers = text > ord(' '), np.arange(len(text))
+	openings = np.argmax(nonblank, axis=1)
+	closings = text.shape[1] - 1 - np.argmax(nonblank[:, ::-1], axis=1)
+	valid = (text[row_numbers, openings] == ord('[')) & (text[row_numbers, closings] == ord(']')) & (np.count_nonzero(text == ord(','), axis=1) == 2)
+	text = text[valid]
+	text = np.where((text == ord(',')) | (text == ord('[')) | (text == ord(']')), ord(' '), text).astype(np.uint8)
+	return _parse_detail_numbers(num_rows, rows[valid], text, 3)
+
+def _scan_detail_chunk(data, start, end, columns=None):
+
+	# Find where every line of the region starts and where its text starts after any indentation
+	buffer = np.zeros(end - start + DETAIL_VALUE_WIDTH + 8, dtype=np.uint8)
+	buffer[:end - start] = np.frombuffer(data, dtype=np.uint8, count=end - start, offset=start)
+	buffer[end - start] = ord('\n')
+	line_ends = np.flatnonzero(buffer[:end - start + 1] == ord('\n'))
+	line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+	text_starts = _skip_blanks(buffer, line_starts)
+	first_characters = buffer[text_starts]
+
+	# Block headers and known detail fields are recognized by their labels, any other indented line holding a colon is
+	# an extra field, and every remaining line ends the block before it
+	header_lines = _lines_starting_with(buffer, text_starts, first_characters, DEVICE_DETAILS_HEADER.encode())
+	is_break = np.ones(len(line_starts), dtype=bool)
+	is_break[header_lines] = False
+	field_lines = []
+	for label, field_columns in DEVICE_DETAIL_FIELDS:
+		lines = _lines_starting_with(buffer, text_starts, first_characters, label)
+		separators = text_starts[lines] + len(label)
+		spaced = np.flatnonzero(buffer[separators] != ord(':'))
+		separators[spaced] = _skip_blanks(buffer, separators[spaced])
+		separated = buffer[separators] == ord(':')
+		field_lines.append((lines[separated], separators[separated] + 1, field_columns if isinstance(field_columns, tuple) else (field_columns,)))
+		is_break[lines[separated]] = False
+	extra_lines = np.flatnonzero(is_break & (text_starts > line_starts))
+	extra_colons = np.array([data.find(b':', start + line_start, start + line_end) - start
+	                         for line_start, line_end in zip(line_starts[extra_lines].tolist(), line_ends[extra_lines].tolist())], dtype=np.int64)
+	extra_lines, extra_colons = extra_lines[extra_colons >= 0], extra_colons[extra_colons >= 0]
+	is_break[extra_lines] = False
+
+	# A line belongs to the block of the latest header as long as no other line came in between
+	is_header = np.zeros(len(line_starts), dtype=bool)
+	is_header[header_lines] = True
+	breaks, headers = np.cumsum(is_break), np.cumsum(is_header)
+	def block_numbers_of(lines):
+		block_numbers = headers[lines] - 1
+		in_block = (block_numbers >= 0) & (breaks[lines] == breaks[header_lines[np.maximum(block_numbers, 0)]] if len(header_lines) else False)
+		return lines[in_block], block_numbers[in_block], in_block
+
+	# Parse the values of each requested field, keeping the last value a block gives for it
+	details = {}
+	for lines, value_starts, field_columns in field_lines:
+		if field_columns[0] != 't' and columns is not None and not set(field_columns).intersection(columns):
+			continue
+		lines, block_numbers, in_block = block_numbers_of(lines)
+		if len(field_columns) > 1:
+			values = _parse_location_values(len(lines), *_gather_values(buffer, value_starts[in_block], line_ends[lines]))
+		else:
+			values = _parse_detail_numbers(len(lines), *_gather_values(buffer, value_starts[in_block], line_ends[lines]),
+			                               parser=int if field_columns[0] in DEVICE_INTEGER_COLUMNS else float)
+		for index, column in enumerate(field_columns):
+			details[column] = np.full(len(header_lines), np.nan)
+			details[column][block_numbers] = values[:, index]
+
+	# Extra fields are only collected when every column was requested
+	extras = {}
+	if columns is None:
+		extra_lines, block_numbers, in_block = block_numbers_of(extra_lines)
+		for line, block_number, colon in zip(extra_lines.tolist(), block_numbers.tolist(), extra_colons[in_block].tolist()):
+			label = bytes(buffer[text_starts[line]:colon]).strip()
+			if label:
+				rows, values = extras.setdefault(label.decode(errors='replace').lower().replace(' ', '_'), (array('q'), []))
+				if not rows or rows[-1] != block_number:
+					rows.append(block_number)
+					values.append(_parse_detail_value(bytes(buffer[colon + 1:line_ends[line]]).strip().decode(errors='replace')))
+	return details, extras
+
+def _scan_device_details(data, start, end, columns=None):
+
+	# Scan the region in chunks that each begin with a block header, small enough for the arrays of a chunk to stay cached
+	details, extras, num_blocks = {}, {}, 0
+	header = b'\n' + DEVICE_DETAILS_HEADER.encode()
+	while start < end:
+		split = data.rfind(header, start, start + DETAIL_SCAN_CHUNK_SIZE) + 1 if end - start > DETAIL_SCAN_CHUNK_SIZE else end
+		if split <= 0:
+			split = data.find(header, start + DETAIL_SCAN_CHUNK_SIZE, end) + 1 or end
+		chunk_details, chunk_extras = _scan_detail_chunk(data, start, split, columns)
+		for column, values in chunk_details.items():
+			details.setdefault(column, []).append(values)
+		for label, (rows, values) in chunk_extras.items():
+			all_rows, all_values = extras.setdefault(label, (array('q'), []))
+			all_rows.frombytes((np.frombuffer(rows, dtype=np.int64) + num_blocks).tobytes())
+			all_values.extend(values)
+		num_blocks += len(chunk_details['t'])
+		start = split
+	return {column: np.concatenate(values) for column, values in details.items()}, extras
+
+def _deduplicate_timestamps(details):
+	timestamps = details.index.to_numpy()
+	if len(timestamps) < 2 or np.all(timestamps[1:] > timestamps[:-1]):
+		return details
+	order = np.argsort(timestamps, kind='stable')
+	timestamps = timestamps[order]
+	return details.iloc[order[np.append(timestamps[1:] != timestamps[:-1], True)]]
+
+def _build_detail_table(details, extras):
+	columns = dict(details)
+	num_blocks = len(columns.get('t', ()))
+	for column, (rows, values) in extras.items():
+		try:
+			values = np.array(values, dtype=np.float64)
+		except (TypeError, ValueError):
+			values = np.array(values, dtype=object)
+		columns[column] = np.full(num_blocks, np.nan, dtype=values.dtype)
+		columns[column][np.frombuffer(rows, dtype=np.int64)] = values
+	timestamps = columns.pop('t', np.zeros(0))
+	valid = timestamps > 0
+	details = pd.DataFrame({column: values[valid] for column, values in columns.items() if not np.all(pd.isna(values[valid]))},
+	                       index=pd.Index(timestamps[valid].astype(np.int64), name='t'))
+	return _deduplicate_timestamps(details)
+
+def _merge_detail_tables(details, new_details):
+	if len(details) == 0:
+		return new_details
+	elif len(new_details) == 0:
+		return details
+	return _deduplicate_timestamps(pd.concat([details, new_details]))
+
+def _detail_view(details, columns):
+	return details.reindex(columns=columns).dropna()
+
+def _read_log_time_offset(log_file_path):
+	return read_log_offset(os.path.dirname(os.path.abspath(log_file_path)))
+
+def _log_time_offsets_at(times, time_offset):
+	return np.rint(log_offsets_at(times, time_offset)).astype(np.int64)
+
+def _shift_detail_times(details, time_offset):
+	if time_offset and len(details):
+		details = details.set_axis(pd.Index(details.index.to_numpy() + _log_time_offsets_at(details.index.to_numpy(), time_offset), name='t'), axis=0)
 	return details
 
+def _log_checkpoint_path(log_file_path):
+	return os.path.join(CACHE_DIRECTORY, hashlib.sha1(os.path.abspath(log_file_path).encode()).hexdigest() + '.checkpoint')
+
+def _load_log_checkpoint(log_file_path):
+	try:
+		checkpoint_path = _log_checkpoint_path(log_file_path)
+		checkpoint = pd.read_pickle(checkpoint_path)
+		os.utime(checkpoint_path)
+		return checkpoint if checkpoint['version'] == LOG_CHECKPOINT_VERSION else None
+	except Exception:
+		return None
+
+def _store_log_checkpoint(log_file_path, checkpoint):
+	checkpoint_path = _log_checkpoint_path(log_file_path)
+	temporary_path = '{}.{}.tmp'.format(checkpoint_path, os.getpid())
+	try:
+		os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+		pd.to_pickle(checkpoint, temporary_path)
+		os.replace(temporary_path, checkpoint_path)
+		_evict_cache()
+	except OSError:
+		try: os.remove(temporary_path)
+		except OSError: pass
+
+def _tail_fingerprint(data, offset):
+	return hashlib.sha1(data[max(offset - LOG_FINGERPRINT_LENGTH, 0):offset]).hexdigest()
+
+def _resume_device_log(data, checkpoint, columns=None):
+
+	# Keep parsing the columns a checkpoint already holds, and start over with both sets when it lacks some that were requested
+	if checkpoint is not None and checkpoint['columns'] is not None and (columns is None or not set(columns).issubset(checkpoint['columns'])):
+		columns, checkpoint = None if columns is None else tuple(sorted(set(columns).union(checkpoint['columns']))), None
+	elif checkpoint is not None:
+		columns = checkpoint['columns']
+	else:
+		columns = None if columns is None else tuple(sorted(columns))
+
+	# Start over if the log was truncated or replaced since the checkpoint was taken, checking the bytes on both
+	# ends of the parsed region since cards share a mount path and logs from different units can begin identically
+	if checkpoint is None or checkpoint['offset'] > len(data) or \
+	   hashlib.sha1(data[:checkpoint['fingerprint_length']]).hexdigest() != checkpoint['fingerprint'] or \
+	   _tail_fingerprint(data, checkpoint['offset']) != checkpoint['tail_fingerprint']:
+		fingerprint_length = min(len(data), LOG_FINGERPRINT_LENGTH)
+		checkpoint = {'version': LOG_CHECKPOINT_VERSION, 'offset': 0, 'details': _build_detail_table({}, {}), 'columns': columns,
+		              'fingerprint': hashlib.sha1(data[:fingerprint_length]).hexdigest(), 'fingerprint_length': fingerprint_length,
+		              'tail_fingerprint': _tail_fingerprint(data, 0)}
+
+	# Only commit complete lines, and hold back a trailing details block that may still be growing from the start of
+	# its header line, since the scan takes the start of its region to be the start of a line
+	commit_offset = max(data.rfind(b'\n', checkpoint['offset']) + 1, checkpoint['offset'])
+	last_block = data.rfind(DEVICE_DETAILS_HEADER.encode(), checkpoint['offset'], commit_offset)
+	if last_block >= 0:
+		match = DEVICE_DETAILS_PATTERN.match(data, last_block, commit_offset)
+		if match and match.end() >= commit_offset:
+			commit_offset = max(data.rfind(b'\n', checkpoint['offset'], last_block) + 1, checkpoint['offset'])
+
+	# Parse only the newly appended data and merge it into the checkpointed series
+	new_details = _build_detail_table(*_scan_device_details(data, checkpoint['offset'], commit_offset, columns))
+	pending_details = _build_detail_table(*_scan_device_details(data, commit_offset, len(data), columns))
+	fingerprint_length = min(len(data), LOG_FINGERPRINT_LENGTH)
+	checkpoint = dict(checkpoint, offset=commit_offset, details=_merge_detail_tables(checkpoint['details'], new_details),
+	                  fingerprint=hashlib.sha1(data[:fingerprint_length]).hexdigest(), fingerprint_length=fingerprint_length,
+	                  tail_fingerprint=_tail_fingerprint(data, commit_offset))
+	return checkpoint, new_details, pending_details
+
+def _read_device_log(log_file_path, checkpoint, columns=None):
+	with open(log_file_path, 'rb') as file:
+		if os.fstat(file.fileno()).st_size == 0:
+			return _resume_device_log(b'', checkpoint, columns)
+		with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+			return _resume_device_log(data, checkpoint, columns)
+
+def parse_device_log(log_file_path, use_checkpoint=True, columns=None):
+	previous_checkpoint = _load_log_checkpoint(log_file_path) if use_checkpoint else None
+	checkpoint, new_details, pending_details = _read_device_log(log_file_path, previous_checkpoint, columns)
+	if use_checkpoint and (previous_checkpoint is None or checkpoint['offset'] != previous_checkpoint['offset'] or
+	                       checkpoint['fingerprint'] != previous_checkpoint['fingerprint'] or checkpoint['columns'] != previous_checkpoint['columns']):
+		_store_log_checkpoint(log_file_path, checkpoint)
+	return _shift_detail_times(_merge_detail_tables(checkpoint['details'], pending_details), _read_log_time_offset(log_file_path))
+
+def follow_device_log(log_file_path, poll_interval=1.0, stop_event=None):
+	checkpoint, last_size = _load_log_checkpoint(log_file_path), None
+	time_offset = _read_log_time_offset(log_file_path)
+	while stop_event is None or not stop_event.is_set():
+		size = os.path.getsize(log_file_path)
+		if size != last_size:
+			first_update = last_size is None
+			checkpoint, new_details, _ = _read_device_log(log_file_path, checkpoint)
+			last_size = size
+			if first_update or not new_details.empty:
+				_store_log_checkpoint(log_file_path, checkpoint)
+				yield _shift_detail_times(checkpoint['details'] if first_update else new_details, time_offset)
+		time.sleep(poll_interval)
+
+def get_voltage_time_series(log_file_path):
+	return _detail_view(parse_device_log(log_file_path, columns=['voltage']), ['voltage']).astype({'voltage': 'int64'})
+
 def get_temperature_time_series(log_file_path):
-	details = defaultdict(dict)
-	with open(log_file_path, 'r') as file:
-		in_details = False
-		timestamp = 0
-		temperature = 0.0
-		for line in file:
-			if 'Current Device Details' in line:
-				in_details = True
-			elif in_details and 'UTC Timestamp' in line:
-				timestamp = int(line.split(':')[1].strip())
-			elif in_details and 'Temperature' in line:
-				temperature = float(line.split(':')[1].strip())
-			if in_details and timestamp > 0 and temperature > 0:
-				details[timestamp]['temp'] = temperature
-				timestamp = 0
-				temperature = 0.0
-				in_details = False
-	details = [dict({'t': ts}, **datum) for ts, datum in details.items()]
-	details = pd.json_normalize(data=details).groupby('t').first()
-	return details
+	return _detail_view(parse_device_log(log_file_path, columns=['temp']), ['temp'])
 
 def get_voltage_vs_temperature(log_file_path):
-	details = defaultdict(dict)
-	with open(log_file_path, 'r') as file:
-		in_details = False
-		timestamp = 0
-		voltage = 0
-		temperature = 0.0
-		for line in file:
-			if 'Current Device Details' in line:
-				in_details = True
-			elif in_details and 'UTC Timestamp' in line:
-				timestamp = int(line.split(':')[1].strip())
-			elif in_details and 'Voltage' in line:
-				voltage = int(line.split(':')[1].strip())
-			elif in_details and 'Temperature' in line:
-				temperature = float(line.split(':')[1].strip())
-			if in_details and timestamp > 0 and voltage > 0 and temperature > 0:
-				details[timestamp]['voltage'] = voltage
-				details[timestamp]['temp'] = temperature
-				timestamp = voltage = 0
-				temperature = 0.0
-				in_details = False
-	details = [dict({'t': ts}, **datum) for ts, datum in details.items()]
-	details = pd.json_normalize(data=details).groupby('t').first()
-	return details
+	return _detail_view(parse_device_log(log_file_path, columns=['voltage', 'temp']), ['voltage', 'temp']).astype({'voltage': 'int64'})
 
 def get_gps_time_series(log_file_path):
-	details = defaultdict(dict)
-	with open(log_file_path, 'r') as file:
-		in_details = False
-		location = None
-		timestamp = 0
-		for line in file:
-			if 'Current Device Details' in line:
-				in_details = True
-			elif in_details and 'UTC Timestamp' in line:
-				timestamp = int(line.split(':')[1].strip())
-			elif in_details and 'Location' in line:
-				location = line.split(':')[1].strip()
-			if in_details and timestamp > 0 and location is not None:
-				loc = json.loads(location)
-				details[timestamp]['lat'] = loc[0]
-				details[timestamp]['lon'] = loc[1]
-				details[timestamp]['ht'] = loc[2]
-				timestamp = 0
-				location = None
-				in_details = False
-	details = [dict({'t': ts}, **datum) for ts, datum in details.items()]
-	details = pd.json_normalize(data=details).groupby('t').first()
-	return details
+	return _detail_view(parse_device_log(log_file_path, columns=['lat', 'lon', 'ht']), ['lat', 'lon', 'ht'])
+
+def _iter_device_details(log_file_path):
+	with open(log_file_path, 'rb') as file:
+		if os.fstat(file.fileno()).st_size > 0:
+			with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+				for match in DEVICE_DETAILS_PATTERN.finditer(data):
+					yield match.group('t', 'voltage', 'temp', 'lat')
+
+def _record_gap(gaps, start, end, gap_threshold_s):
+	if end - start > gap_threshold_s:
+		heapq.heappush(gaps, (end - start, start, end))
+		if len(gaps) > MAX_REPORTED_GAPS:
+			heapq.heappop(gaps)
+
+def get_deployment_statistics(log_file_path, audio_dir=None, imu_data_paths=(), gap_threshold_s=DEFAULT_GAP_THRESHOLD_S):
+	statistics = DeploymentStatistics()
+
+	# Accumulate device health details from the log without materializing its time series
+	voltage_sum = voltage_count = 0
+	slope_sums = [0.0, 0.0, 0.0, 0.0]
+	log_gaps, last_timestamp, first_timestamp = [], None, None
+	time_offset = _read_log_time_offset(log_file_path)
+	for timestamp, voltage, temperature, latitude in _iter_device_details(log_file_path):
+		if not timestamp or int(timestamp) <= 0:
+			continue
+		timestamp = int(timestamp)
+		if time_offset:
+			timestamp += int(_log_time_offsets_at(timestamp, time_offset))
+		if first_timestamp is None:
+			first_timestamp = timestamp
+		statistics.start_time = min(statistics.start_time or timestamp, timestamp)
+		statistics.end_time = max(statistics.end_time or timestamp, timestamp)
+		statistics.num_detail_records += 1
+		if last_timestamp is not None:
+			_record_gap(log_gaps, last_timestamp, timestamp, gap_threshold_s)
+		last_timestamp = timestamp
+		if voltage is not None:
+			voltage = int(voltage)
+			statistics.voltage_min = voltage if statistics.voltage_min is None else min(statistics.voltage_min, voltage)
+			statistics.voltage_max = voltage if statistics.voltage_max is None else max(statistics.voltage_max, voltage)
+			voltage_sum += voltage
+			voltage_count += 1
+			days = (timestamp - first_timestamp) / 86400.0
+			slope_sums[0] += days
+			slope_sums[1] += voltage
+			slope_sums[2] += days * days
+			slope_sums[3] += days * voltage
+		if temperature is not None:
+			temperature = float(temperature)
+			statistics.temperature_min = temperature if statistics.temperature_min is None else min(statistics.temperature_min, temperature)
+			statistics.temperature_max = temperature if statistics.temperature_max is None else max(statistics.temperature_max, temperature)
+		if latitude:
+			statistics.gps_fix_count += 1
+	if statistics.start_time is not None:
+		statistics.uptime_s = statistics.end_time - statistics.start_time
+	if voltage_count:
+		statistics.voltage_mean = voltage_sum / voltage_count
+		denominator = voltage_count * slope_sums[2] - slope_sums[0] * slope_sums[0]
+		if denominator > 0:
+			statistics.voltage_slope_mv_per_day = (voltage_count * slope_sums[3] - slope_sums[0] * slope_sums[1]) / denominator
+	statistics.log_gaps = [(start, end) for _, start, end in sorted(log_gaps, reverse=True)]
+
+	# Read the card's clip manifest in chronological order to count clips and find recording gaps
+	if audio_dir is not None:
+		clip_gaps = []
+		with ClipManifest(audio_dir) as manifest:
+			manifest.update()
+			for _, clip_time, clip_size, _ in manifest.clips():
+				if clip_time is None:
+					continue
+				if statistics.last_clip_time is not None:
+					_record_gap(clip_gaps, statistics.last_clip_time.timestamp(), clip_time.timestamp(), gap_threshold_s)
+				if statistics.first_clip_time is None:
+					statistics.first_clip_time = clip_time
+				statistics.last_clip_time = clip_time
+				statistics.clip_count += 1
+				statistics.clip_bytes += clip_size
+		statistics.clip_gaps = [(datetime.fromtimestamp(start), datetime.fromtimestamp(end)) for _, start, end in sorted(clip_gaps, reverse=True)]
+
+	# IMU sample counts follow directly from each file's header and size, and files too short to hold a header are only reported
+	for imu_data_path in imu_data_paths:
+		try:
+			sample_rate, _ = read_imu_header(imu_data_path)
+			num_samples = max(os.path.getsize(imu_data_path) - IMU_HEADER_LENGTH, 0) // IMU_SAMPLE_DTYPE.itemsize
+		except (OSError, struct.error):
+			statistics.unreadable_imu_files.append(imu_data_path)
+			continue
+		statistics.imu_file_count += 1
+		statistics.imu_sample_count += num_samples
+		statistics.imu_duration_s += num_samples / float(sample_rate) if sample_rate else 0.0
+	return statistics
+
+def _read_clock_pairs(log_file_path):
+	details = parse_device_log(log_file_path)
+	if GPS_TIMESTAMP_COLUMN not in details.columns:
+		return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+	gps_times = pd.to_numeric(details[GPS_TIMESTAMP_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+	valid = np.isfinite(gps_times) & (gps_times > 0)
+	return details.index.to_numpy()[valid].astype(np.int64), gps_times[valid].astype(np.int64)
+
+def estimate_clock_offset(log_file_paths, time_zone='UTC'):
+	if isinstance(log_file_paths, (str, os.PathLike)):
+		log_file_paths = [log_file_paths]
+
+	# Only a GPS time logged in the same details block as a UTC timestamp was taken at the same instant independently of the RTC,
+	# and the parsed UTC timestamps already include any correction an earlier relabel recorded, so the estimate is relative to the current clip names
+	rtc_times, gps_times = [], []
+	for log_file_path in log_file_paths:
+		log_rtc_times, log_gps_times = _read_clock_pairs(log_file_path)
+		rtc_times.append(log_rtc_times)
+		gps_times.append(log_gps_times)
+	rtc_times, gps_times = np.concatenate(rtc_times or [[]]).astype(np.int64), np.concatenate(gps_times or [[]]).astype(np.int64)
+	if not len(rtc_times):
+		return None
+
+	# Clip names are in device-local time, so compare both clocks in that same zone
+	device_times, true_times = (pd.to_datetime(times, unit='s', utc=True).tz_convert(time_zone).tz_localize(None).to_numpy().astype('datetime64[s]')
+	                            .astype(np.int64).astype(np.float64) for times in (rtc_times, gps_times))
+	valid = np.ones(len(device_times), dtype=bool)
+
+	# Fit offset = a + b * days by least squares, then refit once without outlying pairs
+	for _ in range(2):
+		times, offsets = device_times[valid], true_times[valid] - device_times[valid]
+		if len(times) == 0:
+			return None
+		reference_time = times.mean()
+		fit_drift = len(times) > 2 and np.ptp(times) > 0
+		design = np.column_stack((np.ones(len(times)), (times - reference_time) / 86400.0)) if fit_drift else np.ones((len(times), 1))
+		coefficients = np.linalg.lstsq(design, offsets, rcond=None)[0]
+		residuals = offsets - design @ coefficients
+		sigma = np.sqrt(np.sum(residuals ** 2) / max(len(times) - design.shape[1], 1))
+		outliers = np.abs(residuals) > max(CLOCK_OUTLIER_SIGMAS * sigma, 1.0)
+		if not np.any(outliers):
+			break
+		valid[np.flatnonzero(valid)[outliers]] = False
+	return ClockOffsetEstimate(float(coefficients[0]), float(coefficients[1]) if fit_drift else 0.0, pd.Timestamp(round(reference_time), unit='s').to_pydatetime(),
+	                           float(sigma / np.sqrt(len(times))), float(np.sqrt(np.mean(residuals ** 2))), int(len(times)))
+
+def read_device_label(card_root):
+	try:
+		with open(os.path.join(card_root, CONFIG_FILE_NAME), 'r') as file:
+			for line in file:
+				key, separator, value = line.partition('=')
+				if separator and key.strip() == 'DEVICE_LABEL' and value.strip('\t\n "'):
+					return value.strip('\t\n "')
+	except OSError:
+		pass
+	return None
+
+def _find_card_files(card_root):
+	log_paths, imu_paths = [], []
+	for directory, _, filenames in os.walk(card_root):
+		for filename in sorted(filenames):
+			if fnmatch.fnmatch(filename, LOG_FILE_PATTERN):
+				log_paths.append(os.path.join(directory, filename))
+			elif fnmatch.fnmatch(filename, IMU_FILE_PATTERN):
+				imu_paths.append(os.path.join(directory, filename))
+	return log_paths, imu_paths
+
+def _summarize_imu_data(imu_data_path):
+	sample_rate, _ = read_imu_header(imu_data_path)
+	imu_data = decode_imu_data(imu_data_path)
+	summary = {'sample_rate': sample_rate, 'num_samples': len(imu_data),
+	           'start_time': imu_data.index[0] if len(imu_data) else None, 'end_time': imu_data.index[-1] if len(imu_data) else None}
+	for axis in IMU_SAMPLE_DTYPE.names:
+		summary[axis + '_mean'] = float(imu_data[axis].mean())
+		summary[axis + '_std'] = float(imu_data[axis].std())
+	return summary
+
+def ingest_cards(card_roots, max_workers=None):
+	with ProcessPoolExecutor(max_workers=max_workers) as executor:
+
+		# Fan every log and IMU file from every card out across the worker processes, numbering cards that share a device label
+		log_jobs, imu_jobs, device_labels = [], [], set()
+		for card_root in card_roots:
+			device_label = base_label = read_device_label(card_root) or os.path.basename(os.path.normpath(card_root))
+			suffix = 2
+			while device_label in device_labels:
+				device_label, suffix = '{} ({})'.format(base_label, suffix), suffix + 1
+			device_labels.add(device_label)
+			log_paths, imu_paths = _find_card_files(card_root)
+			log_jobs.extend((device_label, log_path, executor.submit(parse_device_log, log_path)) for log_path in log_paths)
+			imu_jobs.extend((device_label, imu_path, executor.submit(_summarize_imu_data, imu_path)) for imu_path in imu_paths)
 
-def get_deployment_statistics(log_file_path):
-	pass
+		# Merge the per-file results into tables keyed by device label, skipping any file that could not be read
+		details, imu_summaries, failed_files = {}, [], []
+		for device_label, log_path, job in log_jobs:
+			try:
+				details[device_label] = _merge_detail_tables(details.get(device_label, pd.DataFrame()), job.result())
+			except (OSError, ValueError) as error:
+				failed_files.append((log_path, str(error)))
+		for device_label, imu_path, job in imu_jobs:
+			try:
+				imu_summaries.append(dict(device=device_label, file=imu_path, **job.result()))
+			except (OSError, ValueError, ZeroDivisionError, struct.error) as error:
+				failed_files.append((imu_path, str(error) or type(error).__name__))
+	details = pd.concat(details, names=['device', 't']) if details else pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=['device', 't']))
+	imu_summaries = pd.DataFrame(imu_summaries, columns=['device', 'file'] if not imu_summaries else None).set_index(['device', 'file'])
+	return details, imu_summaries, failed_files
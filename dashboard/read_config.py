@@ -139,3 +139,37 @@ def read_config(self, filename, SchedulePhase):
          elif '[PHASE]' in line:
             self.deployment_phases.append(SchedulePhase(self.master, tk.StringVar(self.master, 'Default')))
       self._change_deployment_split()
+
+def read_device_timezone(config_path):
+   try:
+      with open(config_path, 'r') as file:
+         for line in file:
+            if '=' in line:
+               key, value = line.split('=')
+               if key.strip() == 'DEVICE_TIMEZONE':
+                  return value.strip('\t\n "') or 'UTC'
+   except OSError:
+      pass
+   return 'UTC'
+
+def read_audio_phases(config_path):
+   phases, time_zone = [], 'UTC'
+   with open(config_path, 'r') as file:
+      for line in file:
+         if '=' in line:
+            key, value = line.split('=')
+            key, value = (key.strip(), value.strip('\t\n "'))
+            if key == 'DEVICE_TIMEZONE':
+               time_zone = value
+            elif key in ('PHASE_NAME', 'PHASE_START_TIME', 'PHASE_END_TIME', 'AUDIO_SAMPLING_RATE_HZ') and phases:
+               phases[-1][key] = value
+         elif '[PHASE]' in line:
+            phases.append({})
+
+   # Convert phase boundaries into the device-local times that audio clips are named with
+   def to_local_datetime(value):
+      return datetime.fromtimestamp(int(value), pytz.utc).astimezone(pytz.timezone(time_zone)).replace(tzinfo=None) if value else None
+   return [{'name': phase.get('PHASE_NAME', 'Default'),
+            'start': to_local_datetime(phase.get('PHASE_START_TIME')),
+            'end': to_local_datetime(phase.get('PHASE_END_TIME')),
+            'sample_rate': int(phase['AUDIO_SAMPLING_RATE_HZ']) if phase.get('AUDIO_SAMPLING_RATE_HZ') else None} for phase in phases]
@@ -1,62 +1,399 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from datetime import datetime, timedelta
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-import glob, os, sys
+import numpy as np
+import os, pytz, re, struct, sys
 
-def relabel_audio_files(audio_dir, offset_in_seconds, original_timestamp=None):
+RELABEL_WORKERS = 8
+RENAMED_SUFFIX = '_renamed'
+ORIGINAL_TIME_FILE_NAME = 'orig_first_log_time.txt'
+JOURNAL_FILE_NAME = '_a3em_relabel.journal'
+JOURNAL_HEADER = 'A3EM-RELABEL-1'
+IMU_FILE_SUFFIX = '.imu'
+IMU_TIMESTAMP_OFFSET = 4
+LOG_FILE_SUFFIX = '.log'
+LOG_OFFSET_FILE_NAME = '_a3em_log_offset.txt'
+AUDIO_FILE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2}) (\d{2})-(\d{2})-(\d{2})\.wav')
 
-   # Get a recursive list of all audio files in the specified directory
-   audio_files = glob.glob(os.path.join(audio_dir, '**', '*.wav'), recursive=True)
-   renamed_dirs = set()
+@dataclass
+class RelabelPlan:
+   audio_dir: str
+   offset_in_seconds: int
+   renames: list = field(default_factory=list)
+   directory_renames: dict = field(default_factory=dict)
+   imu_patches: list = field(default_factory=list)
+   log_offsets: list = field(default_factory=list)
+   directories: set = field(default_factory=set)
+   renamed_dirs: set = field(default_factory=set)
+   unparsed_files: list = field(default_factory=list)
+   collisions: list = field(default_factory=list)
+   resumed: bool = False
 
-   # Loop through each audio file and rename it
-   for audio_file in audio_files:
+def _staged_path(final_path):
+   hour_bin_dir, file_name = os.path.split(final_path)
+   date_dir, hour_bin_string = os.path.split(hour_bin_dir)
+   return os.path.join(date_dir + RENAMED_SUFFIX, hour_bin_string, file_name)
 
-      # Get the current timestamp from the filename
-      audio_path = Path(audio_file)
-      timestamp_str = audio_path.stem
-      timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H-%M-%S')
+def _plan_from_renames(audio_dir, offset_in_seconds, renames):
+   plan = RelabelPlan(audio_dir, offset_in_seconds, renames)
+   for _, staged_file, _ in renames:
+      plan.directories.add(os.path.dirname(staged_file))
+      plan.renamed_dirs.add(os.path.dirname(os.path.dirname(staged_file)))
+   return plan
 
-      # Add the specified offset to the timestamp and create the updated directory pieces
-      new_timestamp = timestamp + timedelta(seconds=offset_in_seconds)
-      date_string = new_timestamp.strftime('%Y-%m-%d_renamed')
-      hour_bin_string = str(int(new_timestamp.strftime('%H')) // 4 * 4).zfill(2)
-      timestamp_string = new_timestamp.strftime('%Y-%m-%d %H-%M-%S.wav')
+def _plan_directory_renames(plan):
+   staged_by_source_dir, names_by_staged_dir = {}, {}
+   for source, staged_file, _ in plan.renames:
+      staged_by_source_dir.setdefault(os.path.dirname(source), []).append(os.path.dirname(staged_file))
+      names_by_staged_dir.setdefault(os.path.dirname(staged_file), set()).add(os.path.basename(staged_file))
 
-      # Create a new filename from the individual pieces
-      renamed_dirs.add(audio_path.parent.parent.parent.joinpath(date_string))
-      new_filename = audio_path.parent.parent.parent.joinpath(date_string, hour_bin_string, timestamp_string)
+   # Move a whole directory of audio files when most of them share a destination and no new name clashes with an old one
+   for source_dir, staged_dirs in sorted(staged_by_source_dir.items()):
+      try: entries = os.listdir(source_dir)
+      except OSError: continue
+      staged_dir = Counter(staged_dirs).most_common(1)[0][0]
+      if len(entries) == len(staged_dirs) and staged_dir not in plan.directory_renames.values() and names_by_staged_dir[staged_dir].isdisjoint(entries):
+         plan.directory_renames[source_dir] = staged_dir
+   return plan
 
-      # Rename the file
-      os.renames(audio_file, new_filename)
+def _current_path(plan, source):
+   source_dir, file_name = os.path.split(source)
+   return os.path.join(plan.directory_renames.get(source_dir, source_dir), file_name)
+
+def _check_collisions(plan, unparsed_files=()):
+   targets = {}
+   for source, staged_file, _ in plan.renames:
+      targets.setdefault(staged_file, []).append(source)
+
+   # Detect files that would overwrite one another or anything left behind by an interrupted relabel
+   plan.unparsed_files = list(unparsed_files)
+   plan.collisions = [(staged_file, sources) for staged_file, sources in targets.items() if len(sources) > 1]
+   plan.collisions += [(renamed_dir, []) for renamed_dir in sorted(plan.renamed_dirs) if os.path.exists(renamed_dir)]
+   for imu_data_path, _, new_timestamp in plan.imu_patches:
+      if not 0 <= new_timestamp < 2**32:
+         raise ValueError('Relabeling would move the IMU start time in {} outside of the representable range'.format(imu_data_path))
+   return plan
+
+def _time_correction(offset_in_seconds, anchors=None):
+   if not anchors:
+      return np.zeros(1), np.array([float(offset_in_seconds)])
+   anchor_times = np.array([np.datetime64(device_time, 's') for device_time, _ in anchors]).astype(np.int64)
+   anchor_offsets = np.array([np.datetime64(true_time, 's') for _, true_time in anchors]).astype(np.int64) - anchor_times
+   order = np.argsort(anchor_times)
+   if np.any(np.diff(anchor_times[order]) == 0):
+      raise ValueError('Each anchor point must refer to a different device time')
+   return anchor_times[order].astype(np.float64), anchor_offsets[order].astype(np.float64)
+
+def _utc_time_correction(offset_in_seconds, anchors=None, time_zone=None):
+   if not anchors or time_zone is None:
+      return _time_correction(offset_in_seconds, anchors)
+
+   # IMU and log times are UTC, so express the device-local anchors in UTC before evaluating the correction there
+   def to_utc(local_time):
+      return pytz.timezone(time_zone).localize(local_time).astimezone(pytz.utc).replace(tzinfo=None)
+   return _time_correction(offset_in_seconds, [(to_utc(device_time), to_utc(true_time)) for device_time, true_time in anchors])
+
+def _offsets_at(times, anchor_times, anchor_offsets):
+   times = np.asarray(times, dtype=np.float64)
+   offsets = np.interp(times, anchor_times, anchor_offsets)
+
+   # Extend the outermost segments so that drift keeps accumulating beyond the anchored range
+   if len(anchor_times) > 1:
+      start_slope = (anchor_offsets[1] - anchor_offsets[0]) / (anchor_times[1] - anchor_times[0])
+      end_slope = (anchor_offsets[-1] - anchor_offsets[-2]) / (anchor_times[-1] - anchor_times[-2])
+      offsets = np.where(times < anchor_times[0], anchor_offsets[0] + (times - anchor_times[0]) * start_slope, offsets)
+      offsets = np.where(times > anchor_times[-1], anchor_offsets[-1] + (times - anchor_times[-1]) * end_slope, offsets)
+   return offsets
+
+def plan_audio_relabel(audio_dir, offset_in_seconds, anchors=None, time_zone=None):
+   audio_dir = os.path.normpath(str(audio_dir))
+   anchor_times, anchor_offsets = _time_correction(offset_in_seconds, anchors)
+   utc_anchor_times, utc_anchor_offsets = _utc_time_correction(offset_in_seconds, anchors, time_zone)
+   audio_files, unparsed_files, imu_files, log_dirs = [], [], [], set()
+
+   # Walk the card once, collecting every audio file along with every IMU file and log directory
+   for directory, _, file_names in os.walk(audio_dir):
+      for file_name in file_names:
+         if file_name.endswith(IMU_FILE_SUFFIX):
+            imu_files.append(os.path.join(directory, file_name))
+         elif file_name.endswith(LOG_FILE_SUFFIX):
+            log_dirs.add(directory)
+         elif file_name.endswith('.wav'):
+            if AUDIO_FILE_PATTERN.fullmatch(file_name):
+               audio_files.append((directory, file_name))
+            else:
+               unparsed_files.append(os.path.join(directory, file_name))
+
+   # Correct all audio timestamps at once and create the updated directory pieces
+   timestamps = np.array([file_name[:10] + 'T' + file_name[11:19].replace('-', ':') for _, file_name in audio_files], dtype='datetime64[s]').astype(np.int64)
+   new_timestamps = timestamps + np.rint(_offsets_at(timestamps, anchor_times, anchor_offsets)).astype(np.int64)
+   new_strings = np.datetime_as_string(new_timestamps.astype('datetime64[s]'), unit='s')
+   hour_bins = new_timestamps // 3600 % 24 // 4 * 4
+   renames = []
+   for (directory, file_name), new_string, hour_bin in zip(audio_files, new_strings.tolist(), hour_bins.tolist()):
+      timestamp_string = new_string[:10] + ' ' + new_string[11:].replace(':', '-') + '.wav'
+      final_file = os.path.join(os.path.dirname(os.path.dirname(directory)), new_string[:10], str(hour_bin).zfill(2), timestamp_string)
+      renames.append((os.path.join(directory, file_name), _staged_path(final_file), final_file))
+   plan = _plan_directory_renames(_plan_from_renames(audio_dir, int(round(anchor_offsets[0])), renames))
+
+   # Shift IMU start times by the correction at each file's own start, and compose the log correction with any earlier one
+   for imu_data_path in imu_files:
+      imu_timestamp = _read_imu_timestamp(imu_data_path)
+      if imu_timestamp is not None:
+         plan.imu_patches.append((imu_data_path, imu_timestamp, imu_timestamp + int(np.rint(_offsets_at(imu_timestamp, utc_anchor_times, utc_anchor_offsets)))))
+   for log_dir in sorted(log_dirs):
+      old_offsets = read_log_offset(log_dir)
+      plan.log_offsets.append((os.path.join(log_dir, LOG_OFFSET_FILE_NAME), old_offsets, _compose_log_offsets(old_offsets, utc_anchor_times, utc_anchor_offsets)))
+   return _check_collisions(plan, unparsed_files)
+
+def _read_imu_timestamp(imu_data_path):
+   with open(imu_data_path, 'rb') as file:
+      header = file.read(IMU_TIMESTAMP_OFFSET + 4)
+   return struct.unpack_from('<I', header, IMU_TIMESTAMP_OFFSET)[0] if len(header) == IMU_TIMESTAMP_OFFSET + 4 else None
+
+def _patch_imu_timestamp(imu_data_path, old_timestamp, new_timestamp):
+   with open(imu_data_path, 'r+b') as file:
+      file.seek(IMU_TIMESTAMP_OFFSET)
+      if struct.unpack('<I', file.read(4))[0] == old_timestamp:
+         file.seek(IMU_TIMESTAMP_OFFSET)
+         file.write(struct.pack('<I', new_timestamp))
+
+def _parse_log_offset(text):
+   values = text.replace(',', ' ').replace(':', ' ').split()
+   if len(values) == 1:
+      return ((0, float(values[0])),)
+   return tuple((int(values[index]), float(values[index + 1])) for index in range(0, len(values) - 1, 2))
+
+def _format_log_offset(offsets):
+   return ','.join('{}:{!r}'.format(time, offset) for time, offset in offsets)
+
+def read_log_offset(log_dir):
+   try:
+      with open(os.path.join(log_dir, LOG_OFFSET_FILE_NAME), 'r') as file:
+         return _parse_log_offset(file.read())
+   except (OSError, ValueError):
+      return ()
+
+def log_offsets_at(times, log_offset):
+   if not log_offset:
+      return np.zeros(np.shape(times))
+   return _offsets_at(times, np.array([time for time, _ in log_offset], dtype=np.float64), np.array([offset for _, offset in log_offset], dtype=np.float64))
+
+def _compose_log_offsets(old_offsets, anchor_times, anchor_offsets):
+   old_times = np.array([time for time, _ in old_offsets] or [0], dtype=np.float64)
+   old_values = np.array([offset for _, offset in old_offsets] or [0], dtype=np.float64)
+
+   # Evaluate the combined correction at every breakpoint of either piecewise-linear function
+   breakpoints = np.unique(np.concatenate((old_times if old_offsets else [], anchor_times - _offsets_at(anchor_times, old_times, old_values) if len(anchor_times) > 1 else [])))
+   if len(breakpoints) == 0:
+      breakpoints = np.zeros(1)
+   previous = _offsets_at(breakpoints, old_times, old_values)
+   offsets = previous + _offsets_at(breakpoints + previous, anchor_times, anchor_offsets)
+   if np.all(np.abs(offsets) < 0.5):
+      return ()
+   return tuple((int(time), round(float(offset), 3)) for time, offset in zip(np.rint(breakpoints), offsets))
+
+def _write_log_offset(offset_file_path, old_offsets, new_offsets):
+   if read_log_offset(os.path.dirname(offset_file_path)) != old_offsets:
+      return
+   if not new_offsets:
+      if os.path.exists(offset_file_path):
+         os.remove(offset_file_path)
+   else:
+      with open(offset_file_path + '.tmp', 'w') as file:
+         file.writelines('{} {!r}\n'.format(time, offset) for time, offset in new_offsets)
+      os.replace(offset_file_path + '.tmp', offset_file_path)
+
+def _merge_directory(source_dir, target_dir):
+   for item in os.listdir(source_dir):
+      source, target = os.path.join(source_dir, item), os.path.join(target_dir, item)
+      if os.path.isdir(source) and os.path.isdir(target):
+         _merge_directory(source, target)
+      else:
+         os.replace(source, target)
+   os.rmdir(source_dir)
+
+def _write_journal(plan, mode, original_timestamp):
+   journal_path = os.path.join(plan.audio_dir, JOURNAL_FILE_NAME)
+   with open(journal_path + '.tmp', 'w') as journal:
+      journal.write('{}\t{}\t{}\t{}\n'.format(JOURNAL_HEADER, mode, plan.offset_in_seconds, '' if original_timestamp is None else original_timestamp))
+      journal.writelines('D\t{}\t{}\n'.format(*(os.path.relpath(path, plan.audio_dir) for path in rename)) for rename in sorted(plan.directory_renames.items()))
+      journal.writelines('I\t{}\t{}\t{}\n'.format(os.path.relpath(path, plan.audio_dir), old, new) for path, old, new in plan.imu_patches)
+      journal.writelines('L\t{}\t{}\t{}\n'.format(os.path.relpath(path, plan.audio_dir), _format_log_offset(old), _format_log_offset(new)) for path, old, new in plan.log_offsets)
+      journal.writelines('R\t{}\t{}\t{}\n'.format(*(os.path.relpath(path, plan.audio_dir) for path in rename)) for rename in plan.renames)
+      journal.flush()
+      os.fsync(journal.fileno())
+   os.replace(journal_path + '.tmp', journal_path)
+   _fsync_directory(plan.audio_dir)
+
+def _fsync_directory(directory):
+   try:
+      directory_fd = os.open(directory, os.O_RDONLY)
+   except OSError:
+      return
+   try: os.fsync(directory_fd)
+   except OSError: pass
+   finally: os.close(directory_fd)
+
+def _append_journal(audio_dir, marker):
+   with open(os.path.join(audio_dir, JOURNAL_FILE_NAME), 'a') as journal:
+      journal.write(marker + '\n')
+      journal.flush()
+      os.fsync(journal.fileno())
+
+def _read_journal(audio_dir):
+   audio_dir = os.path.normpath(str(audio_dir))
+   try:
+      with open(os.path.join(audio_dir, JOURNAL_FILE_NAME), 'r') as journal:
+         header, mode, offset_in_seconds, original_timestamp = journal.readline().rstrip('\n').split('\t')
+         if header != JOURNAL_HEADER:
+            return None
+         renames, directory_renames, imu_patches, log_offsets, markers = [], {}, [], [], set()
+         for line in journal:
+            fields = line.rstrip('\n').split('\t')
+            if fields[0] == 'R':
+               renames.append(tuple(os.path.join(audio_dir, path) for path in fields[1:]))
+            elif fields[0] == 'D':
+               directory_renames[os.path.join(audio_dir, fields[1])] = os.path.join(audio_dir, fields[2])
+            elif fields[0] == 'I':
+               imu_patches.append((os.path.join(audio_dir, fields[1]), int(fields[2]), int(fields[3])))
+            elif fields[0] == 'L':
+               log_offsets.append((os.path.join(audio_dir, fields[1]), _parse_log_offset(fields[2]) if fields[2] else (), _parse_log_offset(fields[3]) if fields[3] else ()))
+            else:
+               markers.add(fields[0])
+   except (OSError, ValueError):
+      return None
+   plan = _plan_from_renames(audio_dir, int(offset_in_seconds), renames)
+   plan.directory_renames, plan.imu_patches, plan.log_offsets = directory_renames, imu_patches, log_offsets
+   return mode, plan, original_timestamp or None, markers
+
+def _run_relabel(plan, mode, original_timestamp, moved=False, resuming=False, max_workers=RELABEL_WORKERS):
+
+   # Patch IMU start times in place and record the log time offset, skipping anything already updated
+   if not moved:
+      for imu_data_path, old_timestamp, new_timestamp in plan.imu_patches:
+         _patch_imu_timestamp(imu_data_path, old_timestamp, new_timestamp)
+      for offset_file_path, old_offset, new_offset in plan.log_offsets:
+         _write_log_offset(offset_file_path, old_offset, new_offset)
+
+   # Create every destination directory once, moving whole directories into place where possible, then move the remaining files concurrently
+   if not moved:
+      moved_dirs = set(plan.directory_renames.values())
+      for directory in sorted((plan.directories - moved_dirs) | {os.path.dirname(directory) for directory in moved_dirs}):
+         os.makedirs(directory, exist_ok=True)
+      for source_dir, staged_dir in sorted(plan.directory_renames.items()):
+         if not resuming or (os.path.exists(source_dir) and not os.path.exists(staged_dir)):
+            os.rename(source_dir, staged_dir)
+      renames = [(_current_path(plan, source), staged) for source, staged, _ in plan.renames]
+      renames = [(source, staged) for source, staged in renames if source != staged and (not resuming or (os.path.exists(source) and not os.path.exists(staged)))]
+      with ThreadPoolExecutor(max_workers=max_workers) as executor:
+         list(executor.map(os.rename, [source for source, _ in renames], [staged for _, staged in renames]))
+      _append_journal(plan.audio_dir, 'M')
+
+   # Remove any source directories that were emptied by the move, deepest first
+   for directory in sorted({os.path.dirname(source) for source, _, _ in plan.renames}, key=len, reverse=True):
+      while directory != plan.audio_dir and directory not in plan.directories:
+         try: os.rmdir(directory)
+         except FileNotFoundError: pass
+         except OSError: break
+         directory = os.path.dirname(directory)
 
    # Loop through the renamed directories and put them back into their original structure
-   for renamed_dir in renamed_dirs:
+   for renamed_dir in sorted(plan.renamed_dirs):
+      if os.path.exists(renamed_dir):
+         original_dir = renamed_dir[:-len(RENAMED_SUFFIX)]
+         if os.path.exists(original_dir):
+            _merge_directory(original_dir, renamed_dir)
+         os.replace(renamed_dir, original_dir)
+
+   # Store the original timestamp if provided, or remove it along with the journal once a relabel is undone
+   if mode == 'undo':
+      if original_timestamp is not None and os.path.exists(os.path.join(plan.audio_dir, ORIGINAL_TIME_FILE_NAME)):
+         os.remove(os.path.join(plan.audio_dir, ORIGINAL_TIME_FILE_NAME))
+      os.remove(os.path.join(plan.audio_dir, JOURNAL_FILE_NAME))
+   else:
+      if original_timestamp is not None:
+         with open(os.path.join(plan.audio_dir, ORIGINAL_TIME_FILE_NAME), 'w') as f:
+            f.write(str(original_timestamp))
+      _append_journal(plan.audio_dir, 'C')
+
+def execute_audio_relabel(plan, original_timestamp=None, max_workers=RELABEL_WORKERS):
+   if plan.collisions:
+      raise FileExistsError('Relabeling would overwrite {} existing file(s), starting with {}'.format(len(plan.collisions), plan.collisions[0][0]))
+   _write_journal(plan, 'relabel', original_timestamp)
+   _run_relabel(plan, 'relabel', original_timestamp, max_workers=max_workers)
+
+def resume_audio_relabel(audio_dir, max_workers=RELABEL_WORKERS):
+   journal = _read_journal(audio_dir)
+   if journal is None or 'C' in journal[3]:
+      return None
+   mode, plan, original_timestamp, markers = journal
+   _run_relabel(plan, mode, original_timestamp, moved='M' in markers, resuming=True, max_workers=max_workers)
+   plan.resumed = True
+   return plan
+
+def undo_audio_relabel(audio_dir, max_workers=RELABEL_WORKERS):
+   plan = resume_audio_relabel(audio_dir, max_workers)
+   if plan is not None and not os.path.exists(os.path.join(plan.audio_dir, JOURNAL_FILE_NAME)):
+      return plan
+   journal = _read_journal(audio_dir)
+   if journal is None:
+      raise FileNotFoundError('No completed relabel operation was found in {}'.format(audio_dir))
 
-      # Move any remaining non-audio files into the renamed directory
-      original_dir = renamed_dir.parent.joinpath(renamed_dir.stem.replace('_renamed', ''))
-      if original_dir.exists():
-         for item in original_dir.iterdir():
-            item.replace(renamed_dir.joinpath(item.name))
-         original_dir.rmdir()
+   # Move every file from its relabeled location back to where it started and restore the original IMU and log times
+   _, relabel_plan, original_timestamp, _ = journal
+   plan = _plan_from_renames(relabel_plan.audio_dir, -relabel_plan.offset_in_seconds, [(final, _staged_path(source), source) for source, _, final in relabel_plan.renames])
+   plan.imu_patches = [(imu_data_path, new, old) for imu_data_path, old, new in relabel_plan.imu_patches]
+   plan.log_offsets = [(offset_file_path, new, old) for offset_file_path, old, new in relabel_plan.log_offsets]
+   plan = _check_collisions(_plan_directory_renames(plan))
+   if plan.collisions:
+      raise FileExistsError('Undoing the relabel would overwrite {} existing file(s), starting with {}'.format(len(plan.collisions), plan.collisions[0][0]))
+   _write_journal(plan, 'undo', original_timestamp)
+   _run_relabel(plan, 'undo', original_timestamp, max_workers=max_workers)
+   return plan
 
-      # Replace the directory to remove the '_renamed' suffix
-      renamed_dir.replace(original_dir)
+def relabel_audio_files(audio_dir, offset_in_seconds, original_timestamp=None, dry_run=False, anchors=None, time_zone=None):
 
-   # Store the original timestamp if provided
-   if original_timestamp is not None:
-      with open(os.path.join(audio_dir, 'orig_first_log_time.txt'), 'w') as f:
-         f.write(str(original_timestamp))
+   # Finish any interrupted operation instead of applying another offset on top of it
+   if not dry_run:
+      plan = resume_audio_relabel(audio_dir)
+      if plan is not None:
+         return plan
+   plan = plan_audio_relabel(audio_dir, offset_in_seconds, anchors, time_zone)
+   if not dry_run:
+      execute_audio_relabel(plan, original_timestamp)
+   return plan
 
 
 if __name__ == '__main__':
 
    # Ensure that proper inputs are passed to this script
-   if len(sys.argv) != 3:
-      print('Usage: {} <AUDIO_DIR> <OFFSET_IN_SECONDS>'.format(sys.argv[0]))
+   dry_run, undo = '--dry-run' in sys.argv[1:], '--undo' in sys.argv[1:]
+   arguments = [argument for argument in sys.argv[1:] if argument not in ('--dry-run', '--undo')]
+   if len(arguments) != (1 if undo else 2):
+      print('Usage: {} [--dry-run] <AUDIO_DIR> <OFFSET_IN_SECONDS>'.format(sys.argv[0]))
+      print('       {} --undo <AUDIO_DIR>'.format(sys.argv[0]))
       sys.exit(1)
+   if undo:
+      plan = undo_audio_relabel(str(Path(arguments[0]).resolve()))
+      print('Restored {} files to their original names'.format(len(plan.renames)))
+      sys.exit(0)
 
-   # Run the actual relabeling function
-   relabel_audio_files(Path(sys.argv[1]).resolve(), int(sys.argv[2]))
+   # Run the actual relabeling function, only reporting the planned renames for a dry run
+   plan = relabel_audio_files(str(Path(arguments[0]).resolve()), int(arguments[1]), dry_run=dry_run)
+   if dry_run:
+      for source, _, target in plan.renames:
+         print('{} -> {}'.format(source, target))
+      for audio_file in plan.unparsed_files:
+         print('Skipping unrecognized file name: {}'.format(audio_file))
+      for imu_data_path, old_timestamp, new_timestamp in plan.imu_patches:
+         print('{}: IMU start time {} -> {}'.format(imu_data_path, old_timestamp, new_timestamp))
+      for offset_file_path, old_offset, new_offset in plan.log_offsets:
+         print('{}: log time correction {} -> {}'.format(offset_file_path, _format_log_offset(old_offset) or 'none', _format_log_offset(new_offset) or 'none'))
+      for target, sources in plan.collisions:
+         print('Collision at {}: {}'.format(target, ', '.join(sources) if sources else 'already exists'))
+      print('{} files would be relabeled across {} directories, {} of which would be moved as a whole'.format(len(plan.renames), len(plan.directories), len(plan.directory_renames)))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# PYTHON INCLUSIONS ---------------------------------------------------------------------------------------------------
+
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+import bisect, os, struct
+
+
+# CONSTANTS AND DEFINITIONS -------------------------------------------------------------------------------------------
+
+WAV_HEADER_READ_SIZE = 64
+DEFAULT_HEADER_SCAN_WORKERS = 8
+
+WAV_EMPTY_FILE = 'Empty file'
+WAV_UNREADABLE_HEADER = 'Unreadable header'
+WAV_SIZE_MISMATCH = 'Chunk size mismatch'
+
+WavHeader = namedtuple('WavHeader', ['riff_size', 'channels', 'sample_rate', 'block_align', 'bits_per_sample', 'data_offset', 'data_size', 'file_size'])
+
+
+# STORAGE CLASSES -----------------------------------------------------------------------------------------------------
+
+@dataclass
+class RecordingSummary:
+   num_clips: int = 0
+   recorded_seconds: float = 0.0
+   phase_clips: Counter = field(default_factory=Counter)
+   phase_seconds: Counter = field(default_factory=Counter)
+   phase_sample_rates: dict = field(default_factory=dict)
+   mismatched_clips: list = field(default_factory=list)
+   unreadable_clips: list = field(default_factory=list)
+
+
+# HEADER PARSING FUNCTIONS --------------------------------------------------------------------------------------------
+
+def _read_at(file, buffer, offset, length):
+   if offset + length <= len(buffer):
+      return buffer[offset:offset+length]
+   file.seek(offset)
+   return file.read(length)
+
+def read_wav_header(wav_path):
+   with open(wav_path, 'rb') as file:
+      file_size = os.fstat(file.fileno()).st_size
+      header = file.read(WAV_HEADER_READ_SIZE)
+      if len(header) < 12 or header[0:4] != b'RIFF' or header[8:12] != b'WAVE':
+         return None
+
+      # Walk the chunk list, only seeking when a chunk lies beyond the initial header block, and give up on any chunk cut short
+      riff_size, fmt, offset = struct.unpack('<I', header[4:8])[0], None, 12
+      while offset + 8 <= file_size:
+         chunk_header = _read_at(file, header, offset, 8)
+         if len(chunk_header) < 8:
+            return None
+         chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+         if chunk_id == b'fmt ' and chunk_size >= 16:
+            fmt_chunk = _read_at(file, header, offset + 8, 16)
+            if len(fmt_chunk) < 16:
+               return None
+            fmt = struct.unpack('<HHIIHH', fmt_chunk)
+         elif chunk_id == b'data':
+            if fmt is None:
+               return None
+            _, channels, sample_rate, _, block_align, bits_per_sample = fmt
+            return WavHeader(riff_size, channels, sample_rate, block_align, bits_per_sample, offset + 8, chunk_size, file_size)
+         offset += 8 + chunk_size + (chunk_size & 1)
+   return None
+
+def get_wav_duration(header):
+   if header.sample_rate == 0 or header.block_align == 0:
+      return 0.0
+   data_size = min(header.data_size, max(header.file_size - header.data_offset, 0))
+   return (data_size // header.block_align) / float(header.sample_rate)
+
+def _needs_repair(header):
+   return header.data_offset + header.data_size > header.file_size or (header.data_size == 0 and header.file_size > header.data_offset) or \
+          not header.data_offset + header.data_size - 8 <= header.riff_size <= header.file_size - 8
+
+def _repaired_chunk_sizes(header):
+   if header.data_size == 0 or header.data_offset + header.data_size > header.file_size:
+      block_align = max(header.block_align, 1)
+      data_size = (header.file_size - header.data_offset) // block_align * block_align
+      return header.data_offset + data_size - 8, data_size
+   return header.file_size - 8, header.data_size
+
+def scan_wav_headers(wav_paths, max_workers=DEFAULT_HEADER_SCAN_WORKERS):
+   def read_header(wav_path):
+      try: return wav_path, read_wav_header(wav_path)
+      except (OSError, struct.error): return wav_path, None
+   with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      yield from executor.map(read_header, wav_paths)
+
+
+# REPAIR FUNCTIONS ----------------------------------------------------------------------------------------------------
+
+def check_wav_file(wav_path):
+   try:
+      if os.stat(wav_path).st_size == 0:
+         return wav_path, WAV_EMPTY_FILE, None
+      header = read_wav_header(wav_path)
+   except (OSError, struct.error):
+      header = None
+   if header is None:
+      return wav_path, WAV_UNREADABLE_HEADER, None
+   if _needs_repair(header):
+      return wav_path, WAV_SIZE_MISMATCH, header
+   return wav_path, None, header
+
+def repair_wav_file(wav_path):
+   header = read_wav_header(wav_path)
+   if header is None:
+      return False
+   if not _needs_repair(header):
+      return True
+   riff_size, data_size = _repaired_chunk_sizes(header)
+
+   # Patch both chunk sizes within the header region and write it back in a single call
+   with open(wav_path, 'r+b') as file:
+      region = bytearray(file.read(header.data_offset))
+      if len(region) != header.data_offset:
+         return False
+      struct.pack_into('<I', region, 4, riff_size)
+      struct.pack_into('<I', region, header.data_offset - 4, data_size)
+      file.seek(4)
+      file.write(region[4:])
+   return True
+
+def scan_wav_files(wav_paths, max_workers=DEFAULT_HEADER_SCAN_WORKERS):
+   with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      yield from executor.map(check_wav_file, wav_paths)
+
+def repair_wav_files(wav_paths, max_workers=DEFAULT_HEADER_SCAN_WORKERS):
+   def repair(wav_path):
+      try: return wav_path, repair_wav_file(wav_path)
+      except (OSError, struct.error): return wav_path, False
+   with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      yield from executor.map(repair, wav_paths)
+
+
+# SUMMARY FUNCTIONS ---------------------------------------------------------------------------------------------------
+
+def _find_phase(phases, phase_starts, timestamp):
+   if not phases or timestamp is None:
+      return None
+   index = max(bisect.bisect_right(phase_starts, timestamp) - 1, 0)
+   phase = phases[index]
+   if (phase['start'] is None or phase['start'] <= timestamp) and (phase['end'] is None or timestamp < phase['end']):
+      return phase
+   return None
+
+def summarize_recordings(recordings, phases):
+   phases = sorted(phases, key=lambda phase: phase['start'] or datetime.min)
+   phase_starts = [phase['start'] or datetime.min for phase in phases]
+   summary = RecordingSummary()
+   for wav_path, timestamp, duration, sample_rate in recordings:
+      summary.num_clips += 1
+      if sample_rate is None:
+         summary.unreadable_clips.append(wav_path)
+         continue
+
+      # Attribute each clip to the deployment phase that was active when it was recorded
+      phase = _find_phase(phases, phase_starts, timestamp)
+      phase_name = phase['name'] if phase else 'Unscheduled'
+      summary.recorded_seconds += duration
+      summary.phase_clips[phase_name] += 1
+      summary.phase_seconds[phase_name] += duration
+      summary.phase_sample_rates.setdefault(phase_name, Counter())[sample_rate] += 1
+      if phase and phase['sample_rate'] and sample_rate != phase['sample_rate']:
+         summary.mismatched_clips.append((wav_path, sample_rate, phase['sample_rate']))
+   return summary
@@ -21,6 +21,7 @@ setuptools.setup(
       'tzlocal',
       'tk',
       'babel',
+      'numpy',
       'pandas',
       'plotly',
    ],